@@ -0,0 +1,80 @@
+from collections import deque
+
+from fasta import reverse_complement
+
+
+class AhoCorasick(object):
+    """ Aho-Corasick automaton over a set of DNA patterns and (by
+        default) their reverse complements, so one pass over the text
+        finds every occurrence of every pattern on both strands. """
+
+    def __init__(self, patterns, alphabet='ACGT', with_rc=True):
+        self.patterns = list(patterns)
+        self.alphabet = alphabet
+        amap = {c: i for i, c in enumerate(alphabet)}
+        self.amap = amap
+        a = len(alphabet)
+        goto = [{}]  # trie edges, one dict per state
+        out = [[]]   # (pattern id, strand, length) ending at each state
+        for pid, p in enumerate(self.patterns):
+            strands = [('+', p)]
+            rc = reverse_complement(p)
+            if with_rc and rc != p:  # palindromes are only reported once
+                strands.append(('-', rc))
+            for strand, s in strands:
+                state = 0
+                for c in s:
+                    ci = amap[c]
+                    if ci not in goto[state]:
+                        goto[state][ci] = len(goto)
+                        goto.append({})
+                        out.append([])
+                    state = goto[state][ci]
+                out[state].append((pid, strand, len(s)))
+        # Breadth-first pass turning the trie into a full transition
+        # table, delta[state * a + c], with failure links folded in
+        delta = [0] * (len(goto) * a)
+        fail = [0] * len(goto)
+        queue = deque()
+        for ci in range(a):
+            if ci in goto[0]:
+                delta[ci] = goto[0][ci]
+                queue.append(goto[0][ci])
+        while queue:
+            state = queue.popleft()
+            out[state] = out[state] + out[fail[state]]
+            for ci in range(a):
+                nxt = goto[state].get(ci)
+                if nxt is None:
+                    delta[state*a + ci] = delta[fail[state]*a + ci]
+                else:
+                    fail[nxt] = delta[fail[state]*a + ci]
+                    delta[state*a + ci] = nxt
+                    queue.append(nxt)
+        self.delta = delta
+        self.out = out
+
+    def search(self, t):
+        """ Scan t once, yielding (pattern id, strand, offset) for every
+            occurrence, in order of where each occurrence ends. """
+        delta, out, amap = self.delta, self.out, self.amap
+        a = len(self.alphabet)
+        state = 0
+        for i, c in enumerate(t):
+            ci = amap.get(c)
+            if ci is None:  # e.g. N: nothing can match across it
+                state = 0
+                continue
+            state = delta[state*a + ci]
+            for pid, strand, plen in out[state]:
+                yield pid, strand, i - plen + 1
+
+
+def naive_with_rc_many(patterns, t):
+    """ Return, for each pattern, the sorted offsets naive_with_rc
+        would report, using a single scan of t. """
+    ac = AhoCorasick(patterns)
+    occurrences = [set() for _ in ac.patterns]
+    for pid, _, offset in ac.search(t):
+        occurrences[pid].add(offset)
+    return [sorted(occ) for occ in occurrences]
@@ -0,0 +1,188 @@
+import functools
+
+
+def z_array(s):
+    """ Use Z algorithm (Gusfield theorem 1.4.1) to preprocess s """
+    assert len(s) > 1
+    z = [len(s)] + [0] * (len(s)-1)
+    # Initial comparison of s[1:] with prefix
+    for i in range(1, len(s)):
+        if s[i] == s[i-1]:
+            z[1] += 1
+        else:
+            break
+    r, l = 0, 0
+    if z[1] > 0:
+        r, l = z[1], 1
+    for k in range(2, len(s)):
+        assert z[k] == 0
+        if k > r:
+            # Case 1
+            for i in range(k, len(s)):
+                if s[i] == s[i-k]:
+                    z[k] += 1
+                else:
+                    break
+            r, l = k + z[k] - 1, k
+        else:
+            # Case 2
+            # Calculate length of beta
+            nbeta = r - k + 1
+            zkp = z[k - l]
+            if nbeta > zkp:
+                # Case 2a: zkp wins
+                z[k] = zkp
+            else:
+                # Case 2b: Compare characters just past r
+                nmatch = 0
+                for i in range(r+1, len(s)):
+                    if s[i] == s[i - k]:
+                        nmatch += 1
+                    else:
+                        break
+                l, r = k, r + nmatch
+                z[k] = r - k + 1
+    return z
+
+
+def n_array(s):
+    """ Compile the N array (Gusfield theorem 2.2.2) from the Z array """
+    return z_array(s[::-1])[::-1]
+
+
+def big_l_prime_array(p, n):
+    """ Compile L' array (Gusfield theorem 2.2.2) using p and N array.
+        L'[i] = largest index j less than n such that N[j] = |P[i:]| """
+    lp = [0] * len(p)
+    for j in range(len(p)-1):
+        i = len(p) - n[j]
+        if i < len(p):
+            lp[i] = j + 1
+    return lp
+
+
+def big_l_array(p, lp):
+    """ Compile L array (Gusfield theorem 2.2.2) using p and L' array.
+        L[i] = largest index j less than n such that N[j] >= |P[i:]| """
+    l = [0] * len(p)
+    l[1] = lp[1]
+    for i in range(2, len(p)):
+        l[i] = max(l[i-1], lp[i])
+    return l
+
+
+def small_l_prime_array(n):
+    """ Compile lp' array (Gusfield theorem 2.2.4) using N array. """
+    small_lp = [0] * len(n)
+    for i in range(len(n)):
+        if n[i] == i+1:  # prefix matching a suffix
+            small_lp[len(n)-i-1] = i+1
+    for i in range(len(n)-2, -1, -1):  # "smear" them out to the left
+        if small_lp[i] == 0:
+            small_lp[i] = small_lp[i+1]
+    return small_lp
+
+
+def good_suffix_table(p):
+    """ Return tables needed to apply good suffix rule. """
+    n = n_array(p)
+    lp = big_l_prime_array(p, n)
+    return lp, big_l_array(p, lp), small_l_prime_array(n)
+
+
+class BoyerMoore(object):
+    """ Encapsulates pattern and associated Boyer-Moore preprocessing.
+        The skips for both rules are precomputed into flat lists:
+        bad_char_skip[i * len(alphabet) + amap[c]] is the bad character
+        shift for a mismatch against c at pattern offset i, and
+        good_suffix_skip[i] the good suffix shift for a mismatch at i. """
+
+    def __init__(self, p, alphabet='ACGT'):
+        self.p = p
+        self.alphabet = alphabet
+        # Create map from alphabet characters to integers
+        self.amap = {c: i for i, c in enumerate(alphabet)}
+        m, a = len(p), len(alphabet)
+        # Bad character rule: shift so the last occurrence of the
+        # mismatched character to the left of i lines up with it
+        self.bad_char_skip = [0] * (m * a)
+        last = [-1] * a
+        for i in range(m):
+            for ci in range(a):
+                self.bad_char_skip[i*a + ci] = i - last[ci]
+            last[self.amap[p[i]]] = i
+        # Good suffix rule
+        if m > 1:
+            _, big_l, small_l_prime = good_suffix_table(p)
+            self.good_suffix_skip = [0] * m
+            for i in range(m - 1):
+                if big_l[i+1] > 0:
+                    self.good_suffix_skip[i] = m - big_l[i+1]
+                else:
+                    self.good_suffix_skip[i] = m - small_l_prime[i+1]
+            self.match_skip_len = m - small_l_prime[1]
+        else:
+            self.good_suffix_skip = [0]
+            self.match_skip_len = 1
+
+    def bad_character_rule(self, i, c):
+        """ Return # skips given by bad character rule at offset i.
+            Characters outside the alphabet can't occur in p, so the
+            pattern shifts all the way past them. """
+        ci = self.amap.get(c)
+        if ci is None:
+            return i + 1
+        return self.bad_char_skip[i*len(self.alphabet) + ci]
+
+    def good_suffix_rule(self, i):
+        """ Given a mismatch at offset i, return amount to shift
+            as determined by (weak) good suffix rule. """
+        return self.good_suffix_skip[i]
+
+    def match_skip(self):
+        """ Return amount to shift in case where P matches T """
+        return self.match_skip_len
+
+
+def boyer_moore(p, p_bm, t):
+    """ Do Boyer-Moore matching. p=pattern, t=text,
+        p_bm=BoyerMoore object for p """
+    # Pull the tables into locals so the inner loop is plain list indexing
+    bc, gs, amap = p_bm.bad_char_skip, p_bm.good_suffix_skip, p_bm.amap
+    a, m = len(p_bm.alphabet), len(p)
+    i = 0
+    occurrences = []
+    while i < len(t) - m + 1:
+        shift = 1
+        mismatched = False
+        for j in range(m-1, -1, -1):
+            c = t[i+j]
+            if p[j] != c:
+                ci = amap.get(c)
+                skip_bc = j + 1 if ci is None else bc[j*a + ci]
+                shift = max(shift, skip_bc, gs[j])
+                mismatched = True
+                break
+        if not mismatched:
+            occurrences.append(i)
+            shift = max(shift, p_bm.match_skip_len)
+        i += shift
+    return occurrences
+
+
+@functools.lru_cache(maxsize=4096)
+def preprocess(p, alphabet='ACGT'):
+    """ Return the BoyerMoore object for p, reusing it if this pattern
+        has been preprocessed recently. """
+    return BoyerMoore(p, alphabet)
+
+
+def boyer_moore_batch(patterns, t, alphabet='ACGT'):
+    """ Match many patterns against one text.  Each distinct pattern is
+        preprocessed once (and cached across calls).  Returns a dict
+        mapping each pattern to its list of occurrences. """
+    results = {}
+    for p in patterns:
+        if p not in results:
+            results[p] = boyer_moore(p, preprocess(p, alphabet), t)
+    return results
@@ -0,0 +1,146 @@
+import numpy as np
+
+from fastq import parse_fastq
+from kmer_counter import MEMORY, count_kmers
+
+
+def decode_kmer(code, k):
+    """ Return the string of a 2-bit k-mer code """
+    return ''.join('ACGT'[(code >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+
+class DeBruijnGraph(object):
+    """ De Bruijn graph with one edge per distinct k-mer, from its
+        (k-1)-mer prefix node to its (k-1)-mer suffix node.  K-mers are
+        kept as a sorted uint64 array of 2-bit codes, never as strings.
+        K-mers seen fewer than min_count times (usually sequencing
+        errors) are dropped.  unitigs() compacts non-branching paths
+        into contigs, and eulerian_walk() spells a superstring when the
+        graph has an Eulerian path. """
+
+    def __init__(self, reads, k, min_count=1, batch_size=100000,
+                 memory=MEMORY):
+        assert 2 <= k <= 32
+        self.k = k
+        # forward-strand counts; memory bounds the counting as in
+        # kmer_counter.count_kmers
+        with count_kmers(reads, k, canonical=False, memory=memory,
+                         batch_size=batch_size) as counts:
+            self.kmers, self.counts = counts.items(min_count)
+        mask = np.uint64((1 << (2 * (k - 1))) - 1)
+        self.heads = self.kmers >> np.uint64(2)  # prefix node of each edge
+        self.tails = self.kmers & mask  # suffix node of each edge
+        # edges are already sorted by prefix node (its leading bits)
+        nodes = np.unique(np.concatenate((self.heads, self.tails)))
+        self.nodes = nodes
+        self.out_degree = np.bincount(np.searchsorted(nodes, self.heads),
+                                      minlength=len(nodes))
+        self.in_degree = np.bincount(np.searchsorted(nodes, self.tails),
+                                     minlength=len(nodes))
+
+    @classmethod
+    def from_fastq(cls, filename, k, min_count=1, batch_size=100000,
+                   memory=MEMORY):
+        """ Build the graph from a FASTQ file, streamed batch_size reads
+            at a time """
+        reads = (bytes(seq) for _, seq, _ in parse_fastq(filename))
+        return cls(reads, k, min_count, batch_size, memory)
+
+    def __len__(self):
+        return len(self.kmers)
+
+    def _successors(self):
+        """ Return next[e]: the edge that must follow edge e in a
+            unitig (its end node has in- and out-degree 1), or -1 """
+        end = np.searchsorted(self.nodes, self.tails)
+        simple = (self.in_degree[end] == 1) & (self.out_degree[end] == 1)
+        nxt = np.searchsorted(self.heads, self.tails)
+        nxt[~simple] = -1
+        return nxt
+
+    def unitigs(self):
+        """ Return the maximal non-branching paths, as strings: every
+            edge lies on exactly one.  Isolated cycles are cut at their
+            smallest k-mer. """
+        nxt = self._successors()
+        has_pred = np.zeros(len(nxt) + 1, dtype=bool)
+        has_pred[nxt] = True  # index -1 (the extra slot) soaks up ends
+        order = np.concatenate((np.flatnonzero(~has_pred[:-1]),
+                                np.arange(len(nxt))))
+        nxt = nxt.tolist()
+        last = (self.kmers & np.uint64(3)).tolist()
+        visited = [False] * len(nxt)
+        unitigs = []
+        for e in order.tolist():  # path starts first, then cycles
+            if visited[e]:
+                continue
+            chars = [decode_kmer(int(self.kmers[e]), self.k)]
+            visited[e] = True
+            e = nxt[e]
+            while e >= 0 and not visited[e]:
+                chars.append('ACGT'[last[e]])
+                visited[e] = True
+                e = nxt[e]
+            unitigs.append(''.join(chars))
+        return unitigs
+
+    def eulerian_walk(self):
+        """ Return the superstring spelled by an Eulerian path through
+            every edge (Hierholzer's algorithm), or raise ValueError if
+            the graph has none.  Only a genome whose (k-1)-mers are all
+            distinct gives such a path, as in the course's examples. """
+        diff = self.out_degree - self.in_degree
+        starts = np.flatnonzero(diff == 1)
+        if (np.abs(diff) > 1).any() or len(starts) > 1 or \
+                np.count_nonzero(diff == -1) != len(starts):
+            raise ValueError('graph has no Eulerian path')
+        if not len(self.kmers):
+            return ''
+        start = int(self.nodes[starts[0]]) if len(starts) else \
+            int(self.heads[0])
+        heads = self.heads
+        used = np.searchsorted(heads, self.nodes)  # next unused edge per node
+        stop = np.searchsorted(heads, self.nodes, 'right')
+        node_index = {int(v): i for i, v in enumerate(self.nodes.tolist())}
+        tails = self.tails.tolist()
+        used, stop = used.tolist(), stop.tolist()
+        stack, path = [start], []
+        while stack:
+            i = node_index[stack[-1]]
+            if used[i] < stop[i]:
+                stack.append(tails[used[i]])
+                used[i] += 1
+            else:
+                path.append(stack.pop())
+        if len(path) != len(self.kmers) + 1:
+            raise ValueError('graph has no Eulerian path (disconnected)')
+        path.reverse()
+        return decode_kmer(path[0], self.k - 1) + \
+            ''.join('ACGT'[v & 3] for v in path[1:])
+
+
+def n50(lengths):
+    """ Return the N50 of the lengths: the largest L such that contigs
+        of length >= L cover at least half the total length """
+    lengths = sorted(lengths, reverse=True)
+    half, total = sum(lengths) / 2, 0
+    for length in lengths:
+        total += length
+        if total >= half:
+            return length
+    return 0
+
+
+def contig_stats(contigs):
+    """ Return a dict of summary statistics for a list of contigs """
+    lengths = [len(c) for c in contigs]
+    return {'contigs': len(lengths),
+            'total_length': sum(lengths),
+            'longest': max(lengths) if lengths else 0,
+            'n50': n50(lengths)}
+
+
+# Example
+# for k in (21, 31):
+#     g = DeBruijnGraph.from_fastq('ERR266411_1.for_asm.fastq', k, min_count=3)
+#     print(k, contig_stats(g.unitigs()))
@@ -0,0 +1,198 @@
+def _peq(p):
+    """ Return {character: bitmask of the positions of p holding it} """
+    peq = {}
+    for i, c in enumerate(p):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    return peq
+
+
+def _myers(p, t, global_alignment):
+    """ Myers' bit-vector algorithm (in Hyyro's formulation).  Each
+        column of the edit distance matrix is held as two bit-vectors
+        of vertical +1/-1 differences, so a column costs a handful of
+        integer operations.  Python ints are arbitrary width, so p can
+        be any length; patterns past 64 characters just use more words.
+        Yields the bottom-row value for each column 1..len(t). """
+    m = len(p)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    carry = 1 if global_alignment else 0  # top row: +1 per column, or 0
+    peq = _peq(p)
+    pv, mv = mask, 0
+    score = m
+    for c in t:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | carry) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        yield score
+
+
+def myers_edit_distance(x, y):
+    """ Same value as editDistance(x, y), in O(|x|) memory """
+    if not x:
+        return len(y)
+    score = len(x)
+    for score in _myers(x, y, True):
+        pass
+    return score
+
+
+def myers_approx_match(p, t, ends=False):
+    """ Same value as approxMatch(p, t): the smallest edit distance
+        between p and any substring of t, in O(|p|) memory.  With
+        ends=True, return (distance, end offsets), listing the end
+        (exclusive) of every best match in t. """
+    best, best_ends = len(p), [0]  # column 0
+    scores = _myers(p, t, False) if p else (0 for _ in t)
+    for j, score in enumerate(scores, 1):
+        if score < best:
+            best, best_ends = score, [j]
+        elif score == best:
+            best_ends.append(j)
+    if ends:
+        return best, best_ends
+    return best
+
+
+def banded_edit_distance(x, y, max_dist):
+    """ Return editDistance(x, y) if it is at most max_dist, else None.
+        Only cells within max_dist of the main diagonal are filled in,
+        two rows of 2*max_dist+1 cells at a time. """
+    k = max_dist
+    if abs(len(x) - len(y)) > k:
+        return None
+    inf = k + 1  # anything above k is as good as infinite
+    width = 2 * k + 1
+    # row i holds D[i][j] for j = i-k .. i+k at index j-i+k
+    prev = [min(d - k, inf) if 0 <= d - k <= len(y) else inf
+            for d in range(width)]
+    for i in range(1, len(x) + 1):
+        cur = [inf] * width
+        row_min = inf
+        for d in range(width):
+            j = i - k + d
+            if j < 0 or j > len(y):
+                continue
+            if j == 0:
+                v = i
+            else:
+                v = prev[d] + (x[i-1] != y[j-1])  # diagonal
+                if d + 1 < width:
+                    v = min(v, prev[d+1] + 1)  # vertical
+                if d > 0:
+                    v = min(v, cur[d-1] + 1)  # horizontal
+            cur[d] = min(v, inf)
+            row_min = min(row_min, cur[d])
+        if row_min > k:
+            return None  # every path already costs more than max_dist
+        prev = cur
+    dist = prev[len(y) - len(x) + k]
+    return dist if dist <= k else None
+
+
+def banded_approx_match(p, t, max_dist, ends=False):
+    """ Return approxMatch(p, t) if it is at most max_dist, else None.
+        Uses Ukkonen's cutoff: in each column only the rows down to the
+        last one still <= max_dist (plus one) can change the answer, so
+        work per column is proportional to the band that stays alive.
+        With ends=True, return (distance, end offsets) as
+        myers_approx_match does ((None, []) if there is no match). """
+    k, m = max_dist, len(p)
+    inf = k + 1
+    col = [min(i, inf) for i in range(m + 1)]  # column 0
+    new = col[:]
+    last = min(k, m)  # last row of the column with a value <= k
+    best, best_ends = (m, [0]) if m <= k else (inf, [])
+    for j in range(1, len(t) + 1):
+        c = t[j-1]
+        new[0] = 0
+        bottom = min(last + 1, m)
+        for i in range(1, bottom + 1):
+            v = col[i-1] + (p[i-1] != c)
+            v = min(v, col[i] + 1, new[i-1] + 1)
+            new[i] = min(v, inf)
+        if bottom < m:
+            new[bottom+1] = inf  # rows past the band can't be <= k
+        last = bottom
+        while last > 0 and new[last] > k:
+            last -= 1
+        if last == m:
+            if new[m] < best:
+                best, best_ends = new[m], [j]
+            elif new[m] == best:
+                best_ends.append(j)
+        col, new = new, col
+    if best > k:
+        best = None
+    if ends:
+        return best, best_ends
+    return best
+
+
+def align_end(p, w):
+    """ Align all of p to a suffix of w (start free, end fixed at the
+        end of w).  Returns (start offset in w, edit distance, CIGAR),
+        with I for characters only in p and D for characters only in
+        w.  Fills the full matrix, so w should be a small window. """
+    m, n = len(p), len(w)
+    D = [[0] * (n + 1) for _ in range(m + 1)]
+    for i in range(m + 1):
+        D[i][0] = i
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            D[i][j] = min(D[i][j-1] + 1, D[i-1][j] + 1,
+                          D[i-1][j-1] + (p[i-1] != w[j-1]))
+    # walk back from the bottom-right corner to the top row
+    ops = []
+    i, j = m, n
+    while i > 0:
+        if j > 0 and D[i][j] == D[i-1][j-1] + (p[i-1] != w[j-1]):
+            ops.append('M')
+            i, j = i - 1, j - 1
+        elif D[i][j] == D[i-1][j] + 1:
+            ops.append('I')
+            i -= 1
+        else:
+            ops.append('D')
+            j -= 1
+    return j, D[m][n], _cigar(reversed(ops))
+
+
+def _cigar(ops):
+    cigar, run, last = [], 0, None
+    for op in ops:
+        if op != last and run:
+            cigar.append('%d%s' % (run, last))
+            run = 0
+        last = op
+        run += 1
+    if run:
+        cigar.append('%d%s' % (run, last))
+    return ''.join(cigar)
+
+
+def approx_match_iter(p, t, max_dist):
+    """ Stream every approximate match of p in t with edit distance
+        <= max_dist, yielding (start, end, distance, CIGAR) with end
+        exclusive.  The scan keeps one bit-vector column (see _myers);
+        for each qualifying end offset, only the window of
+        len(p) + max_dist characters that can hold the match is
+        re-aligned to recover its start and alignment. """
+    m = len(p)
+    if m == 0:
+        return
+    for end, score in enumerate(_myers(p, t, False), 1):
+        if score <= max_dist:
+            wstart = max(0, end - m - max_dist)
+            start, dist, cigar = align_end(p, t[wstart:end])
+            yield wstart + start, end, dist, cigar
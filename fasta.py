@@ -0,0 +1,84 @@
+_COMPLEMENT = str.maketrans('ACGTN', 'TGCAN')
+
+
+def reverse_complement(s):
+    return s.translate(_COMPLEMENT)[::-1]
+
+
+def _fasta_pieces(f, block_size=1 << 20):
+    """ Read a FASTA file in blocks, yielding (name, None) for each
+        header line and (None, piece) for each run of sequence lines,
+        as bytes with the line breaks (and any spaces) removed.  Only a
+        header line split across blocks is carried over; sequence is
+        passed on as soon as it is read, even with no line breaks. """
+    header = None  # the header line read so far, while inside one
+    line_start = True
+    while True:
+        buf = f.read(block_size)
+        if not buf:
+            break
+        pos = 0
+        while pos < len(buf):
+            if header is not None:
+                end = buf.find(b'\n', pos)
+                if end == -1:  # header continues in the next block
+                    header += buf[pos:]
+                    break
+                yield (header + buf[pos:end]).strip(), None
+                header, line_start = None, True
+                pos = end + 1
+            elif line_start and buf[pos:pos+1] == b'>':
+                header = b''  # header line starts a new record
+                pos += 1
+            else:
+                end = buf.find(b'\n>', pos)
+                end = len(buf) if end == -1 else end + 1
+                line_start = buf[end-1:end] == b'\n'
+                yield None, buf[pos:end].translate(None, b' \t\r\n')
+                pos = end
+    if header is not None:
+        yield header.strip(), None
+
+
+def read_fasta(filename, as_bytes=False):
+    """ Stream the records of a (multi-record) FASTA file, yielding
+        (name, sequence) pairs; any sequence before the first header
+        is yielded as a record named ''.  The file is read in large
+        blocks and each sequence grows in place, so peak memory is about
+        one copy of the longest record.  With as_bytes=True sequences are
+        returned as bytearrays, and never decoded. """
+    name, seq = None, bytearray() if as_bytes else ''
+    headless = False  # sequence lines before any header
+    with open(filename, 'rb') as f:
+        for header, piece in _fasta_pieces(f):
+            if header is not None:
+                if name is not None or headless:
+                    yield name or '', seq
+                name, seq = header.decode(), bytearray() if as_bytes else ''
+                headless = False
+            else:
+                headless = name is None
+                seq += piece if as_bytes else piece.decode('ascii')
+    if name is not None or headless:
+        yield name or '', seq
+
+
+def read_genome(filename, as_bytes=False):
+    """ Return the sequences of all records in a FASTA file joined
+        into one contiguous str (or bytearray, with as_bytes=True), the
+        same text readGenome used to build line by line.  Built in place
+        block by block, so peak memory is about the size of the genome. """
+    genome = bytearray() if as_bytes else ''
+    with open(filename, 'rb') as f:
+        for header, piece in _fasta_pieces(f):
+            # ignore header lines with genome information
+            if piece is None:
+                continue
+            genome += piece if as_bytes else piece.decode('ascii')
+    return genome
+
+
+# Example
+# for name, seq in read_fasta('lambda_virus.fa'):
+#     print(name, len(seq))
+# gi|9626243|ref|NC_001416.1| Enterobacteria phage lambda, complete genome 48502
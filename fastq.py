@@ -0,0 +1,79 @@
+import gzip
+
+
+def _open(filename):
+    """ Open filename for binary reading, decompressing gzip input """
+    f = open(filename, 'rb')
+    if f.peek(2)[:2] == b'\x1f\x8b':
+        f.close()
+        return gzip.open(filename, 'rb')
+    return f
+
+
+def parse_fastq(filename, block_size=1 << 22):
+    """ Stream a FASTQ file (plain or gzipped), yielding (name, seq,
+        qual) for each record as memoryview slices of the block read
+        from disk, so no per-line copies are made.  Convert with
+        bytes(...) or str(..., 'ascii') to keep a field beyond the next
+        iteration.  Peak memory is about one block.  Raises ValueError
+        for a malformed record: a missing '@' or '+' line, or sequence
+        and quality lines of different lengths. """
+    num = 0  # records parsed so far, for error messages
+    leftover = b''
+    with _open(filename) as f:
+        while True:
+            data = f.read(block_size)
+            eof = not data
+            buf = leftover + data
+            if eof:
+                if not buf.strip():
+                    return
+                if not buf.endswith(b'\n'):
+                    buf += b'\n'  # final record without a trailing newline
+            mv = memoryview(buf)
+            pos = 0
+            while True:
+                # find the ends of the record's four lines
+                ends = []
+                start = pos
+                for _ in range(4):
+                    end = buf.find(b'\n', start)
+                    if end == -1:
+                        break
+                    ends.append(end)
+                    start = end + 1
+                if len(ends) < 4:
+                    break
+                e1, e2, e3, e4 = [e - (buf[e-1:e] == b'\r') for e in ends]
+                num += 1
+                if buf[pos:pos+1] != b'@':
+                    if not buf[pos:].strip():
+                        break
+                    raise ValueError("record %d: expected '@' line" % num)
+                if buf[ends[1]+1:ends[1]+2] != b'+':
+                    raise ValueError("record %d: expected '+' line" % num)
+                seq = mv[ends[0]+1:e2]
+                qual = mv[ends[2]+1:e4]
+                if len(seq) != len(qual):
+                    raise ValueError('record %d: sequence and quality lengths '
+                                     'differ (%d vs %d)' % (num, len(seq),
+                                                            len(qual)))
+                yield mv[pos+1:e1], seq, qual
+                pos = start
+            if eof:
+                if buf[pos:].strip():
+                    raise ValueError('record %d: truncated record' % (num + 1))
+                return
+            leftover = buf[pos:]
+
+
+def read_fastq_records(filename):
+    """ Stream a FASTQ file, yielding (name, sequence, qualities) strs
+        for each read without loading the whole file """
+    for name, seq, qual in parse_fastq(filename):
+        yield str(name, 'ascii'), str(seq, 'ascii'), str(qual, 'ascii')
+
+
+def read_sequences(filename):
+    """ Return the list of read sequences in a FASTQ file """
+    return [str(seq, 'ascii') for _, seq, _ in parse_fastq(filename)]
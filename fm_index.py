@@ -0,0 +1,216 @@
+import numpy as np
+
+from hamming import encode_text
+
+_CODES = np.zeros(256, dtype=np.uint8)  # 2-bit codes for A, C, G, T
+for _i, _c in enumerate(b'ACGT'):
+    _CODES[_c] = _i
+# _BYTE_COUNTS[c][b] = how many of the 4 codes packed in byte b equal c
+_BYTE_COUNTS = np.array([[sum(((b >> (2*s)) & 3) == c for s in range(4))
+                          for b in range(256)] for c in range(4)],
+                        dtype=np.int64)
+
+
+def suffix_array(t):
+    """ Return the suffix array of t + '$' (the sentinel sorts first,
+        so entry 0 is len(t)) as a uint32 array.  Built by prefix
+        doubling: each round sorts suffixes by the ranks of their first
+        2h characters, using the ranks from the previous round, so it
+        finishes in O(log n) rounds of vectorized sorting.  Ranks are
+        int32 and each round sorts a single int64 key (rank, next
+        rank), so a round peaks at about 30 bytes per base: fine for
+        bacterial genomes or chromosome excerpts, but a whole human
+        chromosome needs several GB. """
+    s = encode_text(t)
+    n = len(s) + 1
+    assert n < 2 ** 31
+    if n == 1:
+        return np.zeros(1, dtype=np.uint32)
+    rank = np.zeros(n, dtype=np.int32)
+    rank[:-1] = s
+    rank[:-1] += 1  # 0 is reserved for the sentinel
+    h = 1
+    while True:
+        # key orders by (rank[i], rank[i+h]), with -1 past the end
+        key = rank.astype(np.int64)
+        key *= int(rank.max()) + 2
+        key[:n-h] += rank[h:]
+        key[:n-h] += 1
+        sa = np.argsort(key)
+        key = key[sa]
+        new = np.cumsum(key[1:] != key[:-1], dtype=np.int32)
+        del key
+        rank[sa[0]] = 0
+        rank[sa[1:]] = new
+        if new[-1] == n - 1:  # every suffix has its own rank
+            return sa.astype(np.uint32)
+        del new
+        h *= 2
+
+
+class SuffixArray(object):
+    """ Suffix array over a text T, answering exact-match queries for
+        patterns of any length by binary search """
+
+    def __init__(self, t):
+        self.text = encode_text(t)
+        self.sa = suffix_array(self.text)
+
+    def _range(self, p):
+        """ Return the range [lo, hi) of suffix array rows starting with p """
+        p = encode_text(p).tobytes()
+        m, text, sa = len(p), self.text, self.sa
+        lo, hi = 0, len(sa)
+        while lo < hi:  # first suffix >= p
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid]+m].tobytes() < p:
+                lo = mid + 1
+            else:
+                hi = mid
+        start, hi = lo, len(sa)
+        while lo < hi:  # first suffix not starting with p
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid]+m].tobytes() == p:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def count(self, p):
+        """ Return the number of occurrences of p """
+        lo, hi = self._range(p)
+        return hi - lo
+
+    def query(self, p):
+        """ Return sorted offsets of all occurrences of p """
+        lo, hi = self._range(p)
+        return sorted(self.sa[lo:hi].tolist())
+
+
+class FMIndex(object):
+    """ FM index over a text T: the BWT of T$, packed 2 bits per A/C/G/T
+        with any other characters (including $) kept as sorted arrays
+        of exception rows, plus occurrence counts every occ_sample rows.
+        count(p) takes O(|p|) rank steps.  With sa_sample set, the
+        suffix array entry of every text offset divisible by sa_sample
+        is also kept, and locate(p) walks back to the nearest one.
+        Per base this costs 2 bits for the BWT, 16/occ_sample bytes
+        for the occurrence counts and 8/sa_sample bytes for the
+        samples: about 0.38 bytes per base with the defaults, 0.31
+        without samples (count only).  Sparser samples make locate()
+        walk further (sa_sample/2 LF steps per hit on average); the
+        2-bit BWT itself is the floor. """
+
+    def __init__(self, t, occ_sample=256, sa_sample=128):
+        assert occ_sample % 4 == 0
+        self.occ_sample = occ_sample
+        self.sa_sample = sa_sample
+        text = encode_text(t)
+        sa = suffix_array(text)
+        self.n = n = len(sa)  # rows, including the sentinel's
+        bwt = np.empty(n, dtype=np.uint8)
+        bwt[sa != 0] = text[sa[sa != 0].astype(np.int64) - 1]
+        bwt[sa == 0] = ord('$')
+        # First column: C[c] = number of characters smaller than c
+        counts = np.bincount(bwt, minlength=256)
+        self.C = {}
+        total = 0
+        for b in range(256):
+            if counts[b]:
+                self.C[chr(b)] = total
+                total += int(counts[b])
+        # Exceptions: rows whose BWT character isn't A/C/G/T
+        acgt = np.zeros(256, dtype=bool)
+        acgt[list(b'ACGT')] = True
+        other = np.flatnonzero(~acgt[bwt])
+        self.exceptions = {}  # character: sorted rows holding it
+        for b in np.unique(bwt[other]):
+            self.exceptions[chr(b)] = other[bwt[other] == b].astype(np.uint32)
+        self.exception_rows = other.astype(np.uint32)
+        # Packed BWT; exception rows are stored as code 0 ('A')
+        codes = _CODES[bwt]
+        codes[other] = 0
+        codes = np.concatenate((codes, np.zeros(-n % 4, dtype=np.uint8)))
+        quads = codes.reshape(-1, 4)
+        self.bwt = (quads[:, 0] | (quads[:, 1] << 2) |
+                    (quads[:, 2] << 4) | (quads[:, 3] << 6))
+        # Occurrence counts of each code before every occ_sample-th row
+        pad = np.concatenate((codes, np.zeros(-len(codes) % occ_sample,
+                                              dtype=np.uint8)))
+        blocks = pad.reshape(-1, occ_sample)
+        self.occ = np.zeros((len(blocks) + 1, 4), dtype=np.uint32)
+        for c in range(4):
+            np.cumsum((blocks == c).sum(axis=1), out=self.occ[1:, c])
+        # Suffix array samples, by text offset
+        if sa_sample:
+            rows = np.flatnonzero(sa % sa_sample == 0)
+            self.sample_rows = rows.astype(np.uint32)
+            self.sample_offsets = sa[rows]
+        del sa, bwt
+
+    @property
+    def nbytes(self):
+        size = self.bwt.nbytes + self.occ.nbytes + 2 * self.exception_rows.nbytes
+        if self.sa_sample:
+            size += self.sample_rows.nbytes + self.sample_offsets.nbytes
+        return size
+
+    def rank(self, c, i):
+        """ Return the number of c's in BWT rows [0, i) """
+        if c not in 'ACGT':
+            rows = self.exceptions.get(c)
+            return 0 if rows is None else int(np.searchsorted(rows, i))
+        code = 'ACGT'.index(c)
+        block = i // self.occ_sample
+        r = int(self.occ[block, code])
+        first, last = block * self.occ_sample // 4, i // 4
+        r += int(_BYTE_COUNTS[code][self.bwt[first:last]].sum())
+        for s in range(i % 4):  # leftover rows in a partial byte
+            r += ((int(self.bwt[last]) >> (2*s)) & 3) == code
+        if code == 0:  # exception rows were packed as 'A'
+            r -= int(np.searchsorted(self.exception_rows, i))
+        return r
+
+    def bwt_char(self, row):
+        i = np.searchsorted(self.exception_rows, row)
+        if i < len(self.exception_rows) and self.exception_rows[i] == row:
+            for c, rows in self.exceptions.items():
+                j = np.searchsorted(rows, row)
+                if j < len(rows) and rows[j] == row:
+                    return c
+        return 'ACGT'[(int(self.bwt[row >> 2]) >> (2 * (row & 3))) & 3]
+
+    def _range(self, p):
+        """ Backward search: rows [lo, hi) whose suffixes start with p """
+        lo, hi = 0, self.n
+        for c in reversed(p):
+            if c not in self.C:
+                return 0, 0
+            lo = self.C[c] + self.rank(c, lo)
+            hi = self.C[c] + self.rank(c, hi)
+            if lo >= hi:
+                return 0, 0
+        return lo, hi
+
+    def count(self, p):
+        """ Return the number of occurrences of p, without listing them """
+        lo, hi = self._range(p)
+        return hi - lo
+
+    def locate(self, row):
+        """ Return the text offset of the suffix at BWT row """
+        steps = 0
+        while True:
+            i = np.searchsorted(self.sample_rows, row)
+            if i < len(self.sample_rows) and self.sample_rows[i] == row:
+                return int(self.sample_offsets[i]) + steps
+            c = self.bwt_char(row)
+            row = self.C[c] + self.rank(c, row)  # LF mapping
+            steps += 1
+
+    def query(self, p):
+        """ Return sorted offsets of all occurrences of p """
+        if not self.sa_sample:
+            raise ValueError('FMIndex built without suffix array samples')
+        lo, hi = self._range(p)
+        return sorted(self.locate(row) for row in range(lo, hi))
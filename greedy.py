@@ -0,0 +1,86 @@
+import heapq
+
+from overlaps import overlap_arrays
+
+
+def greedy_merge(n, edges):
+    """ Greedy merging of n reads given edges (a, b, olen) between read
+        ids: repeatedly take the remaining edge with the longest overlap
+        and join the contig ending in a to the contig starting with b.
+        Edges sit in a heap and are never recomputed.  A popped edge is
+        stale, and dropped, if a already has a successor, b already has
+        a predecessor, or a and b are in the same contig (joining them
+        would close a cycle); union-find tracks contig membership.
+        Returns (succ, olens): succ[a] is the read merged after a (or
+        None) and olens[a] the overlap it was merged with. """
+    heap = [(-olen, a, b) for a, b, olen in edges]
+    heapq.heapify(heap)
+    succ = [None] * n
+    pred = [None] * n
+    olens = [0] * n
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # path halving
+            x = parent[x]
+        return x
+
+    merges = 0
+    while heap and merges < n - 1:
+        olen, a, b = heapq.heappop(heap)
+        if succ[a] is not None or pred[b] is not None:
+            continue
+        ra, rb = find(a), find(b)
+        if ra == rb:
+            continue
+        parent[rb] = ra
+        succ[a], pred[b], olens[a] = b, a, -olen
+        merges += 1
+    return succ, olens
+
+
+def greedy_contigs(reads, k, olaps=None):
+    """ Assemble reads greedily, merging on overlaps of length >= k,
+        and return the list of contigs, in order of their first reads.
+        Duplicate reads are collapsed first.  Overlaps are computed once
+        with overlap_arrays unless olaps is given, either as the arrays
+        (a, b, olen) it returns for the distinct reads or as an
+        {(a, b): olen} dict keyed by read strings (as overlap_map
+        returns).  Merges use read-level overlaps, which gives the same
+        merges as greedy_scs (up to ties) when the reads all have the
+        same length. """
+    reads = list(dict.fromkeys(reads))
+    if not isinstance(olaps, dict):
+        a, b, olen = overlap_arrays(reads, k) if olaps is None else olaps
+        keep = olen >= k
+        edges = zip(a[keep].tolist(), b[keep].tolist(), olen[keep].tolist())
+    else:
+        ids = {r: i for i, r in enumerate(reads)}
+        edges = [(ids[a], ids[b], olen) for (a, b), olen in olaps.items()
+                 if olen >= k]
+    succ, olens = greedy_merge(len(reads), edges)
+    has_pred = set(b for b in succ if b is not None)
+    contigs = []
+    for head in range(len(reads)):
+        if head in has_pred:
+            continue
+        parts = [reads[head]]
+        a = head
+        while succ[a] is not None:
+            parts.append(reads[succ[a]][olens[a]:])
+            a = succ[a]
+        contigs.append(''.join(parts))
+    return contigs
+
+
+def greedy_scs(reads, k):
+    """ Greedy shortest common superstring: the greedy contigs joined
+        end to end, as wk4b's greedy_scs returns """
+    return ''.join(greedy_contigs(reads, k))
+
+
+# Example
+# from fastq import read_sequences
+# scs = greedy_scs(read_sequences('ads1_week4_reads.fq'), 30)
+# print("scs len:", len(scs), "num 'A':", scs.count('A'), "num 'T':", scs.count('T'))
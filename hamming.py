@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def encode_text(t):
+    """ Return t as a uint8 array of character codes.  Accepts a str,
+        bytes/bytearray, an existing uint8 array, or anything whose
+        slices are one of those (e.g. a PackedGenome). """
+    if isinstance(t, np.ndarray):
+        return t
+    if isinstance(t, str):
+        t = t.encode('ascii')
+    elif not isinstance(t, (bytes, bytearray, memoryview)):
+        t = t[:].encode('ascii')
+    return np.frombuffer(t, dtype=np.uint8)
+
+
+def naive_kmm(p, t, k=2, counts=False, tile_size=1 << 20):
+    """ Return offsets of all alignments of p in t with at most k
+        mismatches (substitutions only), as naive_2mm does for k=2.
+        The text is scanned in tiles of tile_size alignments; within a
+        tile, mismatches for every alignment are accumulated one
+        pattern column at a time.  With counts=True, also return the
+        number of alignments tried and character comparisons made, as
+        naive_with_counts does for k=0. """
+    pa = encode_text(p)
+    m, n = len(pa), len(t)
+    num_aligns = max(n - m + 1, 0)
+    occurrences = []
+    num_chars = 0
+    for s in range(0, num_aligns, tile_size):
+        e = min(s + tile_size, num_aligns)
+        window = encode_text(t[s:e+m-1])  # text covered by this tile
+        mm = np.zeros(e - s, dtype=np.int32)
+        alive = np.ones(e - s, dtype=bool)
+        for j in range(m):  # loop over pattern columns
+            if counts:
+                num_chars += int(np.count_nonzero(alive))
+            mm += window[j:j+e-s] != pa[j]
+            alive &= mm <= k
+            if (j & 7) == 7 and not alive.any():
+                break  # every alignment in the tile has failed
+        occurrences.extend((np.flatnonzero(alive) + s).tolist())
+    if counts:
+        return occurrences, num_aligns, num_chars
+    return occurrences
+
+
+def naive_2mm(p, t):
+    """ Vectorized drop-in for naive_2mm """
+    return naive_kmm(p, t, 2)
+
+
+def naive_with_counts(p, t):
+    """ Vectorized drop-in for naive_with_counts """
+    return naive_kmm(p, t, 0, counts=True)
@@ -0,0 +1,273 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from fastq import parse_fastq
+from kmer_index import encode_2bit, encode_kmer, kmer_codes
+
+_HASH = np.uint64(0x9E3779B97F4A7C15)  # seeds the partition hash
+
+# Default working memory for count_kmers, in bytes, and the bytes it
+# needs per distinct k-mer held: code and count, the chunk being merged
+# in, and the copies np.unique makes while merging
+MEMORY = 1 << 30
+KMER_BYTES = 96
+
+
+def canonical_kmer_codes(t, k):
+    """ Return (kmers, ok) for every offset of t: the canonical k-mer
+        there, the smaller 2-bit code of the k-mer and its reverse
+        complement, and whether it was all ACGT """
+    codes, valid = encode_2bit(t)
+    fwd, ok = kmer_codes(codes, valid, k)
+    # complement is 3 - code; the reverse complement text's k-mers run
+    # backwards relative to the forward ones
+    rev, _ = kmer_codes(3 - codes[::-1], valid[::-1], k)
+    return np.minimum(fwd, rev[::-1]), ok
+
+
+def canonical_kmer(s):
+    """ Return the canonical 2-bit code of the k-mer string s, or None
+        if s has a character other than A, C, G, T """
+    rc = s[::-1].translate(str.maketrans('ACGT', 'TGCA'))
+    code, rc_code = encode_kmer(s), encode_kmer(rc)
+    return None if code is None else min(code, rc_code)
+
+
+def _batches(reads, batch_size):
+    batch = []
+    for read in reads:
+        batch.append(read)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _count_sorted(kmers, weights=None):
+    """ Return the distinct values of kmers and their (weighted) counts """
+    kmers, inv = np.unique(kmers, return_inverse=True)
+    return kmers, np.bincount(inv, weights, len(kmers)).astype(np.int64)
+
+
+def _partition(kmers, partitions, level=0):
+    """ Partition number of each k-mer code, from a hash (splitmix64)
+        seeded by level, so a partition that is split again spreads
+        over the new partitions independently of the first split """
+    h = kmers + np.uint64(int(_HASH) * (level + 1) % 2**64)
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return h % np.uint64(partitions)
+
+
+def _count_batch(batch, k, canonical=True):
+    sep = b'N' if isinstance(batch[0], (bytes, memoryview)) else 'N'
+    t = sep.join(batch)
+    if canonical:
+        kmers, ok = canonical_kmer_codes(t, k)
+    else:
+        kmers, ok = kmer_codes(*encode_2bit(t), k)
+    return _count_sorted(kmers[ok])
+
+
+def _read_chunks(path, size):
+    """ Yield (kmers, counts) chunks of at most size entries from a
+        spilled partition's files, removing them once read """
+    with open(path + '.kmers', 'rb') as fk, open(path + '.counts', 'rb') as fc:
+        while True:
+            kmers = np.fromfile(fk, dtype=np.uint64, count=size)
+            if not len(kmers):
+                break
+            yield kmers, np.fromfile(fc, dtype=np.int64, count=size)
+    os.remove(path + '.kmers')
+    os.remove(path + '.counts')
+
+
+def _count_chunks(chunks, limit, directory, name='part', level=0):
+    """ Merge a stream of (kmers, counts) chunks into partitions of at
+        most limit distinct k-mers each, returning a list of (kmers,
+        counts) pairs.  Chunks are merged in memory until the table
+        outgrows limit; then it and the rest of the stream are split by
+        hash into enough partition files in directory (named after name)
+        that each should fit, and each file is counted the same way,
+        splitting again if it still doesn't.  Partitions counted from
+        files are saved and memory-mapped back. """
+    kmers = np.zeros(0, dtype=np.uint64)
+    counts = np.zeros(0, dtype=np.int64)
+    for new, new_counts in chunks:
+        kmers, counts = _count_sorted(np.concatenate((kmers, new)),
+                                      np.concatenate((counts, new_counts)))
+        if len(kmers) > limit:
+            break
+    else:
+        if not level:
+            return [(kmers, counts)]
+        name = os.path.join(directory, name)
+        np.save(name + '.kmers.npy', kmers)
+        np.save(name + '.counts.npy', counts)
+        return [(np.load(name + '.kmers.npy', mmap_mode='r'),
+                 np.load(name + '.counts.npy', mmap_mode='r'))]
+
+    partitions = 2 * -(-len(kmers) // limit)
+    names = ['%s.%d' % (name, i) for i in range(partitions)]
+    paths = [os.path.join(directory, name) for name in names]
+    for path in paths:
+        open(path + '.kmers', 'wb').close()
+        open(path + '.counts', 'wb').close()
+    del new, new_counts
+    while True:
+        pid = _partition(kmers, partitions, level)
+        for i, path in enumerate(paths):
+            sel = pid == i
+            with open(path + '.kmers', 'ab') as f:
+                kmers[sel].tofile(f)
+            with open(path + '.counts', 'ab') as f:
+                counts[sel].tofile(f)
+        del pid, sel
+        try:
+            kmers, counts = next(chunks)
+        except StopIteration:
+            break
+    del kmers, counts
+    parts = []
+    for name, path in zip(names, paths):
+        parts += _count_chunks(_read_chunks(path, max(limit // 2, 1)), limit,
+                               directory, name, level + 1)
+    return parts
+
+
+class KmerCounts(object):
+    """ K-mer counts (canonical unless counted with canonical=False),
+        held as one or more partitions, each a pair of arrays (sorted
+        k-mer codes, counts); every k-mer is in exactly one.  Partitions
+        count_kmers wrote to disk are memory-mapped, so only the pages a
+        query touches are read.  Call close() (or use as a context
+        manager) to remove the files. """
+
+    def __init__(self, k, parts, directory=None, canonical=True):
+        self.k = k
+        self.parts = parts
+        self.directory = directory
+        self.canonical = canonical
+
+    def __len__(self):
+        return sum(len(kmers) for kmers, _ in self.parts)
+
+    @property
+    def total(self):
+        """ Total number of k-mers counted """
+        return sum(int(counts.sum()) for _, counts in self.parts)
+
+    def count(self, s):
+        """ Return the count of k-mer string s (either strand, if
+            canonical) """
+        code = canonical_kmer(s) if self.canonical else encode_kmer(s)
+        if code is None:
+            return 0
+        code = np.uint64(code)
+        for kmers, counts in self.parts:
+            i = np.searchsorted(kmers, code)
+            if i < len(kmers) and kmers[i] == code:
+                return int(counts[i])
+        return 0
+
+    def histogram(self):
+        """ Return h where h[c] is the number of distinct k-mers seen
+            exactly c times """
+        h = np.zeros(1, dtype=np.int64)
+        for _, counts in self.parts:
+            part = np.bincount(counts)
+            if len(part) > len(h):
+                h = np.concatenate((h, np.zeros(len(part) - len(h), np.int64)))
+            h[:len(part)] += part
+        return h
+
+    def items(self, min_count=1):
+        """ Return (kmers, counts) in memory, sorted by k-mer code, for
+            the k-mers seen at least min_count times """
+        kmers = np.concatenate([kmers[counts >= min_count]
+                                for kmers, counts in self.parts])
+        counts = np.concatenate([counts[counts >= min_count]
+                                 for _, counts in self.parts])
+        order = np.argsort(kmers)
+        return kmers[order], counts[order]
+
+    def solid(self, min_count):
+        """ Return the sorted codes of k-mers seen at least min_count
+            times; rarer k-mers are mostly sequencing errors """
+        return np.sort(np.concatenate(
+            [kmers[counts >= min_count] for kmers, counts in self.parts]))
+
+    def genome_size(self):
+        """ Estimate genome size from the histogram: skip the error
+            peak at low counts up to the first valley, then divide the
+            k-mers counted beyond it by the count at the coverage peak.
+            Returns 0 if the histogram has no such peak. """
+        h = self.histogram()
+        valley = 1
+        while valley + 1 < len(h) and h[valley + 1] <= h[valley]:
+            valley += 1
+        if valley + 1 >= len(h):
+            return 0
+        peak = valley + int(np.argmax(h[valley:]))
+        kmers = int((np.arange(valley, len(h)) * h[valley:]).sum())
+        return int(round(kmers / peak))
+
+    def close(self):
+        self.parts = []
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def count_kmers(reads, k, canonical=True, memory=MEMORY, directory=None,
+                batch_size=100000):
+    """ Count the k-mers (k <= 32) of reads (strs or bytes), returning
+        KmerCounts.  With canonical=True a k-mer and its reverse
+        complement count as one, the smaller code; otherwise k-mers are
+        counted as they appear.  Reads are consumed batch_size at a time
+        and joined with N separators, so no k-mer spans two reads.
+
+        Memory is bounded by one batch plus memory bytes (about
+        KMER_BYTES per distinct k-mer held).  Each batch's counts are
+        merged into one sorted table in memory; if the table outgrows
+        the budget, it and the remaining batches are split by a hash of
+        the k-mer into partition files in a temporary directory (under
+        directory, if given), as many as the budget calls for, and each
+        partition is then counted on its own and saved for
+        memory-mapping. """
+    assert 1 <= k <= 32
+    limit = max(memory // KMER_BYTES, 1)  # distinct k-mers held at once
+    chunks = (_count_batch(batch, k, canonical)
+              for batch in _batches(reads, batch_size))
+    tmp = tempfile.mkdtemp(prefix='kmers', dir=directory)
+    parts = _count_chunks(chunks, limit, tmp)
+    if len(parts) == 1 and not isinstance(parts[0][0], np.memmap):
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp = None
+    return KmerCounts(k, parts, tmp, canonical)
+
+
+def count_fastq(filename, k, **options):
+    """ Count the k-mers of a FASTQ file, streamed; options (canonical,
+        memory, ...) are passed to count_kmers """
+    reads = (bytes(seq) for _, seq, _ in parse_fastq(filename))
+    return count_kmers(reads, k, **options)
+
+
+# Example
+# with count_fastq('ERR266411_1.for_asm.fastq', 21, memory=1 << 24) as kc:
+#     print(len(kc), kc.total, kc.histogram()[:10], kc.genome_size())
+#     print(kc.count('ACGTACGTACGTACGTACGTA'), len(kc.solid(3)))
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+from hamming import encode_text
+
+_CODES = np.full(256, 4, dtype=np.uint8)  # 4 marks a non-ACGT character
+for _i, _c in enumerate(b'ACGT'):
+    _CODES[_c] = _i
+
+# A bucket table (4**k + 1 entries) is used only when k <= MAX_BUCKET_K
+# and it has at most BUCKET_FACTOR entries per text position, so its
+# size follows the text; otherwise queries binary-search the sorted
+# k-mer codes.
+MAX_BUCKET_K = 13
+BUCKET_FACTOR = 2
+
+# Index file layout: header (magic, version, k, ival, bucket flag, text
+# length, number of offsets, SHA-1 of the text), then either the bucket
+# table (uint32) or the sorted k-mer codes (uint64), then the offsets
+# (uint32).  Arrays start on 8-byte boundaries so they can be mmapped.
+MAGIC = b'KIDX'
+VERSION = 1
+_HEADER = struct.Struct('<4sIIII4xQQ20s4x')
+
+
+def encode_2bit(t):
+    """ Return (codes, valid) for t: codes is a uint8 array with A, C,
+        G, T as 0-3, valid marks which positions are one of those. """
+    codes = _CODES[encode_text(t)]
+    valid = codes < 4
+    codes[~valid] = 0
+    return codes, valid
+
+
+def kmer_codes(codes, valid, k, ival=1):
+    """ Return (kmers, ok) for every offset of the text: the k
+        characters starting there, spaced ival apart, packed 2 bits
+        each into an integer, and whether they were all ACGT. """
+    span = 1 + ival * (k - 1)
+    n = len(codes) - span + 1
+    if n <= 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=bool)
+    kmers = np.zeros(n, dtype=np.uint64)
+    ok = np.ones(n, dtype=bool)
+    for j in range(0, span, ival):
+        kmers <<= np.uint64(2)
+        kmers |= codes[j:j+n]
+        ok &= valid[j:j+n]
+    return kmers, ok
+
+
+def encode_kmer(s):
+    """ Return the 2-bit integer code of s, or None if s has a
+        character other than A, C, G, T """
+    code = 0
+    for c in s:
+        i = 'ACGT'.find(c)
+        if i < 0:
+            return None
+        code = (code << 2) | i
+    return code
+
+
+def use_buckets(k, text_length):
+    """ Whether a KmerIndex of k-mers over a text this long gets a
+        bucket table; see MAX_BUCKET_K """
+    return k <= MAX_BUCKET_K and 4 ** k <= BUCKET_FACTOR * max(text_length, 1)
+
+
+def genome_checksum(t):
+    """ Return the SHA-1 hex digest of the text """
+    return hashlib.sha1(encode_text(t)).hexdigest()
+
+
+class KmerIndex(object):
+    """ Array-backed index of the k-mers of a text T, a drop-in for
+        Index (and, with ival > 1, for SubseqIndex: k characters spaced
+        ival apart).  Every k-mer is packed into an integer, and the
+        offsets are held in one uint32 array ordered by k-mer (offsets
+        ascending within a k-mer).  For small k (see use_buckets) a
+        bucket table gives each k-mer's slice of that array directly.
+        K-mers with a character other than A, C, G, T are not indexed.
+        Indexes can be saved and memory-mapped back with load(), or
+        open() can do both keyed by the text's checksum. """
+
+    def __init__(self, t, k, ival=1, checksum=None):
+        """ Create index from all subsequences of t consisting of k
+            characters spaced ival positions apart """
+        self.k = k
+        self.ival = ival
+        self.span = 1 + ival * (k - 1)
+        self.text_length = len(t)
+        self.checksum = checksum or genome_checksum(t)
+        codes, valid = encode_2bit(t)
+        kmers, ok = kmer_codes(codes, valid, k, ival)
+        positions = np.flatnonzero(ok)
+        kmers = kmers[positions]
+        order = np.argsort(kmers, kind='stable')  # keep offsets ascending
+        self.offsets = positions[order].astype(np.uint32)
+        kmers = kmers[order]
+        if use_buckets(k, len(t)):
+            # bucket c starts at the first sorted code >= c
+            self.buckets = np.searchsorted(
+                kmers, np.arange(4 ** k + 1, dtype=np.uint64)).astype(np.uint32)
+            self.kmers = None
+        else:
+            self.buckets = None
+            self.kmers = kmers
+
+    def query(self, p):
+        """ Return index hits for first k-mer (or subsequence) of p """
+        if len(p) < self.span:
+            return []
+        code = encode_kmer(p[:self.span:self.ival])
+        if code is None:
+            return []
+        if self.buckets is not None:
+            lo, hi = self.buckets[code], self.buckets[code+1]
+        else:
+            lo = np.searchsorted(self.kmers, np.uint64(code), 'left')
+            hi = np.searchsorted(self.kmers, np.uint64(code), 'right')
+        return self.offsets[lo:hi].tolist()
+
+    def save(self, filename):
+        """ Write the index to filename.  The file is written under a
+            temporary name and renamed into place, so concurrent
+            readers never see a partial index. """
+        table = self.buckets if self.buckets is not None else self.kmers
+        tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+        with open(tmp_filename, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.k, self.ival,
+                                 self.buckets is not None, self.text_length,
+                                 len(self.offsets),
+                                 bytes.fromhex(self.checksum)))
+            f.write(table.tobytes())
+            f.write(b'\0' * (-table.nbytes % 8))
+            f.write(self.offsets.tobytes())
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename, t=None):
+        """ Memory-map an index written by save().  If the text t is
+            given, check that the index was built from it. """
+        with open(filename, 'rb') as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError('%s is not a k-mer index file' % filename)
+        magic, version, k, ival, bucketed, text_length, num_offsets, digest = \
+            _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a k-mer index file' % filename)
+        if t is not None and genome_checksum(t) != digest.hex():
+            raise ValueError('%s was built from a different text' % filename)
+        index = cls.__new__(cls)
+        index.k, index.ival = k, ival
+        index.span = 1 + ival * (k - 1)
+        index.text_length = text_length
+        index.checksum = digest.hex()
+        pos = _HEADER.size
+        if bucketed:
+            index.buckets = np.memmap(filename, dtype=np.uint32, mode='r',
+                                      offset=pos, shape=(4 ** k + 1,))
+            index.kmers = None
+            pos += index.buckets.nbytes
+        else:
+            index.buckets = None
+            index.kmers = np.memmap(filename, dtype=np.uint64, mode='r',
+                                    offset=pos, shape=(num_offsets,))
+            pos += index.kmers.nbytes
+        pos += -pos % 8
+        index.offsets = np.memmap(filename, dtype=np.uint32, mode='r',
+                                  offset=pos, shape=(num_offsets,))
+        return index
+
+    @classmethod
+    def open(cls, t, k, ival=1, directory='.', checksum=None):
+        """ Load the index of t for (k, ival) from directory, building
+            and saving it first if it isn't there yet.  Either way the
+            returned index is memory-mapped from the file, so processes
+            opening the same index share one copy.  Files are named by
+            the text's checksum, k and ival; pass checksum if it is
+            already known to avoid hashing t again. """
+        checksum = checksum or genome_checksum(t)
+        filename = index_filename(checksum, k, ival, directory)
+        if os.path.exists(filename):
+            return cls.load(filename)
+        cls(t, k, ival, checksum=checksum).save(filename)
+        return cls.load(filename)
+
+
+def index_filename(checksum, k, ival=1, directory='.'):
+    return os.path.join(directory, '%s.k%d.i%d.kidx' % (checksum[:16], k, ival))
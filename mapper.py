@@ -0,0 +1,163 @@
+import argparse
+import itertools
+import multiprocessing
+import sys
+import tempfile
+import time
+
+from fasta import read_fasta, reverse_complement
+from fastq import read_fastq_records
+from pigeonhole import ApproximateMatcher
+
+# SAM flags
+REVERSE, UNMAPPED, SECONDARY = 16, 4, 256
+
+
+def map_read(matcher, name, seq, qual, n=2, ref_name='ref'):
+    """ Align one read, on both strands, allowing up to n mismatches.
+        Returns (SAM lines, number of hits): one line per hit, hits
+        after the first flagged secondary, or a single unmapped line.
+        QNAME is the first word of the FASTQ header.  A read equal to
+        its own reverse complement is only aligned forward. """
+    name = name.split(None, 1)[0] if name.strip() else '*'
+    strands = [(0, seq, qual)]
+    rc = reverse_complement(seq)
+    if rc != seq:
+        strands.append((REVERSE, rc, qual[::-1]))
+    hits = []
+    for flag, s, q in strands:
+        for offset, mm in matcher.match(s, n, mismatches=True):
+            hits.append((offset, flag, s, q, mm))
+    hits.sort()
+    if not hits:
+        return ['%s\t%d\t*\t0\t0\t*\t*\t0\t0\t%s\t%s\n'
+                % (name, UNMAPPED, seq, qual)], 0
+    lines = []
+    for i, (offset, flag, s, q, mm) in enumerate(hits):
+        if i > 0:
+            flag |= SECONDARY
+        lines.append('%s\t%d\t%s\t%d\t255\t%dM\t*\t0\t0\t%s\t%s\tNM:i:%d\n'
+                     % (name, flag, ref_name, offset + 1, len(s), s, q, mm))
+    return lines, len(hits)
+
+
+def map_reads(fastq_filename, matcher, n=2, out=sys.stdout, ref_name='ref',
+              processes=1, chunk_size=1000):
+    """ Align every read in a FASTQ file, on both strands, against the
+        text indexed by matcher (an ApproximateMatcher), allowing up to
+        n mismatches, and write the hits to out as SAM records.
+
+        With processes > 1, reads are sent to a pool of workers in
+        chunks of chunk_size and the results written in input order.
+        The text and its k-mer indexes are written to the matcher's
+        directory (a temporary one if it has none) and every worker
+        memory-maps those files, so the pool holds one copy of each.
+
+        Returns a dict of counts and the reads/second throughput. """
+    out.write('@HD\tVN:1.6\tSO:unsorted\n')
+    out.write('@SQ\tSN:%s\tLN:%d\n' % (ref_name, len(matcher.text)))
+    num_reads, num_mapped, num_hits = 0, 0, 0
+    start = time.perf_counter()
+    if processes > 1:
+        results = _map_parallel(fastq_filename, matcher, n, ref_name,
+                                processes, chunk_size)
+    else:
+        results = ([map_read(matcher, name, seq, qual, n, ref_name)]
+                   for name, seq, qual in read_fastq_records(fastq_filename))
+    for chunk in results:
+        for lines, hits in chunk:
+            num_reads += 1
+            num_mapped += hits > 0
+            num_hits += hits
+            out.writelines(lines)
+    seconds = time.perf_counter() - start
+    return {'reads': num_reads, 'mapped': num_mapped, 'hits': num_hits,
+            'seconds': seconds,
+            'reads_per_second': num_reads / seconds if seconds else 0.0}
+
+
+def _chunks(fastq_filename, chunk_size):
+    chunk = []
+    for record in read_fastq_records(fastq_filename):
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _map_parallel(fastq_filename, matcher, n, ref_name, processes, chunk_size):
+    """ Yield per-chunk results from a worker pool, in input order """
+    tmpdir = None
+    if matcher.directory is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        matcher.directory = tmpdir.name
+    try:
+        text_filename = matcher.save_text()
+        chunks = _chunks(fastq_filename, chunk_size)
+        first = next(chunks, None)
+        if first is None:
+            return
+        # build the indexes for this read length once, up front, rather
+        # than having every worker race to build them
+        matcher.prepare(len(first[0][1]), n)
+        with multiprocessing.Pool(
+                processes, initializer=_init_worker,
+                initargs=(text_filename, matcher.directory, matcher.checksum,
+                          n, ref_name)) as pool:
+            for result in pool.imap(_map_chunk,
+                                    itertools.chain([first], chunks)):
+                yield result
+    finally:
+        if tmpdir is not None:
+            matcher.directory = None
+            tmpdir.cleanup()
+
+
+_worker = {}  # per-process state set up by _init_worker
+
+
+def _init_worker(text_filename, directory, checksum, n, ref_name):
+    _worker['matcher'] = ApproximateMatcher.open_text(text_filename, directory,
+                                                      checksum)
+    _worker['n'] = n
+    _worker['ref_name'] = ref_name
+
+
+def _map_chunk(chunk):
+    matcher, n, ref_name = _worker['matcher'], _worker['n'], _worker['ref_name']
+    return [map_read(matcher, name, seq, qual, n, ref_name)
+            for name, seq, qual in chunk]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Map FASTQ reads to a genome allowing mismatches')
+    parser.add_argument('genome', help='FASTA file (records are concatenated)')
+    parser.add_argument('reads', help='FASTQ file')
+    parser.add_argument('-n', type=int, default=2, help='max mismatches')
+    parser.add_argument('-o', '--output', help='SAM output (default stdout)')
+    parser.add_argument('--index-dir',
+                        help='directory for persistent k-mer index files')
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    records = list(read_fasta(args.genome))
+    t = ''.join(seq for _, seq in records)
+    ref_name = records[0][0].split(' ', 1)[0] if len(records) == 1 else 'genome'
+    matcher = ApproximateMatcher(t, directory=args.index_dir)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        stats = map_reads(args.reads, matcher, args.n, out, ref_name,
+                          args.processes)
+    finally:
+        if args.output:
+            out.close()
+    sys.stderr.write('%(reads)d reads, %(mapped)d mapped, %(hits)d hits in '
+                     '%(seconds).2fs (%(reads_per_second).0f reads/s)\n' % stats)
+
+
+if __name__ == '__main__':
+    main()
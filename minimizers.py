@@ -0,0 +1,138 @@
+import numpy as np
+
+from kmer_index import encode_2bit, kmer_codes
+from overlaps import overlap
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)  # odd, so the k-mer hash is invertible
+
+
+def _hash(kmers):
+    """ Scramble k-mer codes so minimizers aren't biased toward
+        low-complexity (e.g. poly-A) k-mers, as lexicographic order is """
+    h = kmers * _MIX
+    return h ^ (h >> np.uint64(29))
+
+
+def read_minimizers(reads, k, w):
+    """ Return arrays (hashes, read ids, offsets) of the (w, k)
+        minimizers of reads: in every window of w consecutive k-mers of
+        a read, the k-mer with the smallest hash (leftmost on ties).
+        Windows are handled for the whole list at once, with the reads
+        joined by N separators so no window spans two reads.  Each
+        minimizer position is reported once. """
+    joined = 'N'.join(reads) if reads and isinstance(reads[0], str) \
+        else b'N'.join(reads)
+    codes, valid = encode_2bit(joined)
+    kmers, ok = kmer_codes(codes, valid, k)
+    empty = np.zeros(0, dtype=np.int64)
+    if len(kmers) < w:
+        return np.zeros(0, dtype=np.uint64), empty, empty
+    hashes = _hash(kmers)
+    windows = np.lib.stride_tricks.sliding_window_view(hashes, w)
+    pos = np.arange(len(windows)) + np.argmin(windows, axis=1)
+    good = np.concatenate(([0], np.cumsum(ok)))
+    full = good[w:] - good[:-w] == w  # every k-mer in the window is ACGT
+    pos = np.unique(pos[full])
+    lengths = np.fromiter(map(len, reads), dtype=np.int64, count=len(reads))
+    starts = np.cumsum(lengths + 1) - lengths - 1
+    rid = np.searchsorted(starts, pos, 'right') - 1
+    return hashes[pos], rid, pos - starts[rid]
+
+
+def _sorted_unique(keys):
+    """ np.unique by sorting, which for these keys is much faster than
+        the hash-based path np.unique takes for integer input """
+    keys = np.sort(keys)
+    return keys[np.concatenate((keys[:1] == keys[:1], keys[1:] != keys[:-1]))]
+
+
+class MinimizerIndex(object):
+    """ Sketch of a read set holding only each read's (w, k)
+        minimizers, as parallel arrays sorted by hash: about 2/(w+1)
+        entries per read position instead of one per k-mer.  Any two
+        reads with an exact suffix/prefix overlap of at least w+k-1
+        share the minimizer of a window inside it, so candidate_pairs
+        misses none of those, unless an N leaves no all-ACGT window in
+        the overlap. """
+
+    def __init__(self, reads, k=15, w=10):
+        self.k, self.w = k, w
+        self.num_reads = len(reads)
+        self.lengths = np.fromiter(map(len, reads), dtype=np.int64,
+                                   count=len(reads))
+        hashes, rid, off = read_minimizers(reads, k, w)
+        order = np.lexsort((off, rid, hashes))
+        self.hashes = hashes[order]
+        self.read_ids = rid[order].astype(np.int32)
+        self.offsets = off[order].astype(np.int32)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @property
+    def nbytes(self):
+        return self.hashes.nbytes + self.read_ids.nbytes + self.offsets.nbytes
+
+    def candidate_pairs(self, min_length, max_occ=None, chunk_size=1 << 22):
+        """ Return sorted arrays (a, b) of distinct read pairs that share
+            a minimizer placed so that a suffix of a of length at least
+            min_length could be a prefix of b.  If max_occ is given,
+            minimizers in more than max_occ places (repeats) are skipped,
+            trading sensitivity for speed.  Pairs are generated a
+            block of index entries at a time, about chunk_size per block,
+            and deduplicated as integer keys. """
+        h = self.hashes
+        bounds = np.flatnonzero(np.concatenate(([True], h[1:] != h[:-1],
+                                                [True])))
+        sizes = np.diff(bounds)
+        size = np.repeat(sizes, sizes)  # size of each entry's group
+        group_start = np.repeat(bounds[:-1], sizes)
+        if max_occ is not None:
+            size[size > max_occ] = 0
+        ends = np.cumsum(size)
+        rid = self.read_ids.astype(np.int64)
+        off = self.offsets.astype(np.int64)
+        n = self.num_reads
+        keys = []
+        lo = 0
+        while lo < len(h):
+            hi = int(np.searchsorted(ends, ends[lo] - size[lo] + chunk_size,
+                                     'right'))
+            hi = max(hi, lo + 1)
+            counts = size[lo:hi]
+            total = int(counts.sum())
+            left = np.repeat(np.arange(lo, hi), counts)
+            right = np.repeat(group_start[lo:hi], counts) + np.arange(total) \
+                - np.repeat(np.cumsum(counts) - counts, counts)
+            a, b = rid[left], rid[right]
+            shift = off[left] - off[right]  # where b starts within a
+            ok = (a != b) & (shift >= 0) & \
+                (self.lengths[a] - shift >= min_length)
+            keys.append(_sorted_unique(a[ok] * n + b[ok]))
+            lo = hi
+        keys = _sorted_unique(np.concatenate(keys)) if keys else \
+            np.zeros(0, dtype=np.int64)
+        return keys // max(n, 1), keys % max(n, 1)
+
+
+def minimizer_overlap_map(reads, min_length, k=15, w=10, max_occ=None):
+    """ Return {(a, b): olen} for overlaps of length >= min_length, as
+        overlap_map does, running overlap() only on the candidate pairs
+        of a MinimizerIndex.  Exact whenever min_length >= w + k - 1
+        and max_occ is None, apart from overlaps too broken up by N's
+        to hold a window of w k-mers (see MinimizerIndex). """
+    reads = list(dict.fromkeys(reads))
+    index = MinimizerIndex(reads, k, w)
+    olaps = {}
+    for a, b in zip(*(x.tolist() for x in index.candidate_pairs(min_length,
+                                                                max_occ))):
+        olen = overlap(reads[a], reads[b], min_length)
+        if olen >= min_length:
+            olaps[(reads[a], reads[b])] = olen
+    return olaps
+
+
+# Example
+# from fastq import read_sequences
+# olaps = minimizer_overlap_map(read_sequences('ERR266411_1.for_asm.fastq'), 30)
+# print(len(olaps), len(set(a for a, b in olaps)))
@@ -0,0 +1,190 @@
+import numpy as np
+
+from overlaps import overlap_arrays
+
+
+class OverlapGraph(object):
+    """ Overlap graph with read ids 0..n-1 as nodes and an edge a -> b
+        for each suffix/prefix overlap, stored in compressed sparse row
+        form: the edges out of read a are targets[indptr[a]:indptr[a+1]]
+        (ascending), with overlap lengths in olens alongside.  That is
+        three flat arrays for the whole graph instead of a dict with a
+        tuple of read strings per edge. """
+
+    def __init__(self, reads, a, b, olen):
+        """ Build from the reads and parallel arrays of edges a -> b
+            with overlap length olen, in any order """
+        self.reads = reads
+        n = len(reads)
+        a, b, olen = (np.asarray(x, dtype=np.int64) for x in (a, b, olen))
+        order = np.lexsort((b, a))
+        self.targets = b[order].astype(np.int32)
+        self.olens = olen[order].astype(np.int32)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(a, minlength=n), out=self.indptr[1:])
+        self.in_degrees = np.bincount(self.targets, minlength=n)
+
+    @classmethod
+    def from_reads(cls, reads, k):
+        """ Build the graph of overlaps of length >= k between the
+            distinct reads, computed with overlap_arrays """
+        reads = list(dict.fromkeys(reads))
+        return cls(reads, *overlap_arrays(reads, k))
+
+    @classmethod
+    def from_overlap_map(cls, olaps, reads=None):
+        """ Build from an {(a, b): olen} dict keyed by read strings, as
+            overlap_map returns.  Reads with no overlaps are only nodes
+            if given in reads. """
+        reads = list(dict.fromkeys(reads or []))
+        ids = {r: i for i, r in enumerate(reads)}
+        for pair in olaps:
+            for r in pair:
+                if r not in ids:
+                    ids[r] = len(reads)
+                    reads.append(r)
+        a = np.fromiter((ids[x] for x, _ in olaps), np.int64, len(olaps))
+        b = np.fromiter((ids[y] for _, y in olaps), np.int64, len(olaps))
+        olen = np.fromiter(olaps.values(), np.int64, len(olaps))
+        return cls(reads, a, b, olen)
+
+    def __len__(self):
+        return len(self.reads)
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        return self.targets.nbytes + self.olens.nbytes + self.indptr.nbytes + \
+            self.in_degrees.nbytes
+
+    def out_degree(self, i=None):
+        """ Out-degree of read i, or an array of all out-degrees """
+        if i is None:
+            return np.diff(self.indptr)
+        return int(self.indptr[i+1] - self.indptr[i])
+
+    def in_degree(self, i=None):
+        """ In-degree of read i, or an array of all in-degrees """
+        if i is None:
+            return self.in_degrees
+        return int(self.in_degrees[i])
+
+    def successors(self, i):
+        """ Return (targets, olens) arrays of the edges out of read i """
+        lo, hi = self.indptr[i], self.indptr[i+1]
+        return self.targets[lo:hi], self.olens[lo:hi]
+
+    def sources(self):
+        """ Return the source read of every edge, parallel to targets """
+        return np.repeat(np.arange(len(self), dtype=np.int32),
+                         self.out_degree())
+
+    def to_overlap_map(self):
+        """ Return the {(a, b): olen} dict keyed by read strings """
+        reads = self.reads
+        return {(reads[a], reads[b]): olen for a, b, olen in
+                zip(self.sources().tolist(), self.targets.tolist(),
+                    self.olens.tolist())}
+
+    def transitive_reduction(self, chunk_size=1 << 22):
+        """ Return a new graph without transitive edges: a -> c is
+            dropped when some a -> b -> c places c at the same offset
+            relative to a, since the two shorter overlaps then already
+            imply it (Myers' string graph reduction, exact overlaps).
+            The two-edge paths are generated a block of edges at a time,
+            about chunk_size paths per block, and looked up among the
+            edges as sorted integer keys. """
+        n = len(self)
+        lengths = np.fromiter(map(len, self.reads), np.int64, n)
+        src = self.sources().astype(np.int64)
+        dst = self.targets.astype(np.int64)
+        shift = lengths[src] - self.olens  # where dst starts, relative to src
+        span = int(shift.max()) + 1 if len(shift) else 1
+        # edges are sorted by (src, dst), so these keys are sorted too
+        keys = (src * n + dst) * span + shift
+        transitive = np.zeros(len(keys), dtype=bool)
+        out_deg = self.out_degree()
+        # paths a -> b -> c from each edge a -> b
+        paths = out_deg[dst]
+        ends = np.cumsum(paths)
+        lo = 0
+        while lo < len(src):
+            hi = int(np.searchsorted(ends, ends[lo] - paths[lo] + chunk_size,
+                                     'right'))
+            hi = max(hi, lo + 1)
+            first, counts = self.indptr[dst[lo:hi]], paths[lo:hi]
+            total = int(counts.sum())
+            pos = np.arange(total) - np.repeat(np.cumsum(counts) - counts,
+                                               counts)
+            idx = np.repeat(first, counts) + pos
+            a = np.repeat(src[lo:hi], counts)
+            c = dst[idx]
+            s = np.repeat(shift[lo:hi], counts) + shift[idx]
+            ok = (c != a) & (s < span)
+            pk = (a[ok] * n + c[ok]) * span + s[ok]
+            i = np.searchsorted(keys, pk)
+            hit = i < len(keys)
+            hit[hit] = keys[i[hit]] == pk[hit]
+            transitive[i[hit]] = True
+            lo = hi
+        keep = ~transitive
+        return OverlapGraph(self.reads, src[keep], dst[keep],
+                            self.olens[keep])
+
+    def non_branching_paths(self):
+        """ Return the maximal non-branching paths as lists of read ids:
+            every edge lies on exactly one, and internal reads have
+            in- and out-degree 1.  Isolated cycles are included, cut at
+            their lowest read id. """
+        out_deg = self.out_degree().tolist()
+        in_deg = self.in_degree().tolist()
+        indptr, targets = self.indptr.tolist(), self.targets.tolist()
+        paths = []
+        visited = [False] * len(self)  # internal reads already on a path
+        for v in range(len(self)):
+            if in_deg[v] == 1 and out_deg[v] == 1:
+                continue
+            for e in range(indptr[v], indptr[v+1]):
+                path = [v]
+                w = targets[e]
+                while in_deg[w] == 1 and out_deg[w] == 1:
+                    visited[w] = True
+                    path.append(w)
+                    w = targets[indptr[w]]
+                path.append(w)
+                paths.append(path)
+        for v in range(len(self)):
+            if in_deg[v] == 1 and out_deg[v] == 1 and not visited[v]:
+                path = [v]
+                visited[v] = True
+                w = targets[indptr[v]]
+                while w != v:
+                    visited[w] = True
+                    path.append(w)
+                    w = targets[indptr[w]]
+                path.append(v)
+                paths.append(path)
+        return paths
+
+    def spell(self, path):
+        """ Return the string spelled by a path of read ids """
+        parts = [self.reads[path[0]]]
+        for a, b in zip(path, path[1:]):
+            targets, olens = self.successors(a)
+            j = np.searchsorted(targets, b)
+            parts.append(self.reads[b][int(olens[j]):])
+        return ''.join(parts)
+
+    def contigs(self):
+        """ Return the strings spelled by the non-branching paths """
+        return [self.spell(path) for path in self.non_branching_paths()]
+
+
+# Example
+# from fastq import read_sequences
+# g = OverlapGraph.from_reads(read_sequences('ERR266411_1.for_asm.fastq'), 30)
+# r = g.transitive_reduction()
+# print(g.num_edges, r.num_edges, len(r.contigs()))
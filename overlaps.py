@@ -0,0 +1,225 @@
+from collections import OrderedDict
+
+import numpy as np
+
+_BASE = np.uint64(0x9E3779B97F4A7C15)  # odd multiplier for the rolling hash
+
+
+def overlap(a, b, min_length=3):
+    """ Return length of longest suffix of 'a' matching
+        a prefix of 'b' that is at least 'min_length'
+        characters long.  If no such overlap exists,
+        return 0. """
+    start = 0  # start all the way at the left
+    while True:
+        start = a.find(b[:min_length], start)  # look for b's prefix in a
+        if start == -1:  # no more occurrences to right
+            return 0
+        # found occurrence; check for full suffix/prefix match
+        if b.startswith(a[start:]):
+            return len(a)-start
+        start += 1  # move just past previous match
+
+
+class OverlapCache(object):
+    """ Bounded LRU memo for overlap(a, b, min_length).  Reads are
+        interned to small integer ids, so each entry is keyed by three
+        ints rather than two read strings, and at most maxsize entries
+        are kept: the least recently used one is evicted to make room.
+        A read's id is released once no entry uses it, so memory stays
+        proportional to maxsize however many distinct reads go by.
+        hits and misses count lookups. """
+
+    def __init__(self, maxsize=1 << 18):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # (id_a, id_b, min_length): olen
+        self.ids = {}  # read: id
+        self.reads = {}  # id: read
+        self.refs = {}  # id: number of entries using it
+        self.next_id = 0
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _intern(self, read):
+        i = self.ids.get(read)
+        if i is None:
+            i = self.ids[read] = self.next_id
+            self.reads[i] = read
+            self.refs[i] = 0
+            self.next_id += 1
+        return i
+
+    def _release(self, i):
+        self.refs[i] -= 1
+        if not self.refs[i]:
+            del self.ids[self.reads.pop(i)], self.refs[i]
+
+    def overlap(self, a, b, min_length=3, use_cache=True):
+        """ Return overlap(a, b, min_length), from the cache if possible.
+            With use_cache=False it is computed and nothing is stored. """
+        if not use_cache or not self.maxsize:
+            return overlap(a, b, min_length)
+        ia, ib = self.ids.get(a), self.ids.get(b)
+        if ia is not None and ib is not None:
+            key = (ia, ib, min_length)
+            olen = self.entries.get(key)
+            if olen is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return olen
+        self.misses += 1
+        olen = overlap(a, b, min_length)
+        ia, ib = self._intern(a), self._intern(b)
+        self.refs[ia] += 1
+        self.refs[ib] += 1
+        self.entries[(ia, ib, min_length)] = olen
+        if len(self.entries) > self.maxsize:
+            (ea, eb, _), _ = self.entries.popitem(last=False)
+            self._release(ea)
+            self._release(eb)
+        return olen
+
+    def clear(self):
+        self.__init__(self.maxsize)
+
+
+def overlap_arrays(reads, k):
+    """ Return arrays (a, b, olen) of read ids, sorted by a then b, for
+        every ordered pair of distinct reads where the longest suffix of
+        reads[a] matching a prefix of reads[b] has length olen >= k
+        (the value overlap(reads[a], reads[b], k) returns).
+
+        All reads are laid out as rows of one uint8 matrix.  A rolling
+        hash gives every read prefix and every read suffix of length
+        >= k a 64-bit key; sorting both key sets and searching one in
+        the other pairs up equal (length, hash) entries without ever
+        comparing reads one by one.  Each candidate pair is then checked
+        8 characters at a time, so hash collisions cannot produce false
+        overlaps, and the longest verified overlap is kept for each
+        pair.  Working memory is a few dozen bytes per read position
+        plus per candidate; the hashes are freed before the candidates
+        are expanded. """
+    empty = np.zeros(0, dtype=np.int32)
+    n = len(reads)
+    lengths = np.fromiter(map(len, reads), dtype=np.int64, count=n)
+    if n == 0 or lengths.max() < k:
+        return empty, empty, empty
+    width = int(lengths.max())
+    # 8 spare columns so every 8-byte window of a row is in bounds
+    mat = np.zeros((n, width + 8), dtype=np.uint8)
+    rows = np.repeat(np.arange(n), lengths)
+    cols = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths,
+                                            lengths)
+    mat[rows, cols] = np.frombuffer(''.join(reads).encode('ascii'),
+                                    dtype=np.uint8)
+    del rows, cols
+
+    # pre[r, l] = hash of the first l characters of read r (mod 2**64)
+    pre = np.zeros((n, width + 1), dtype=np.uint64)
+    powers = np.ones(width + 1, dtype=np.uint64)
+    for l in range(width):
+        pre[:, l+1] = pre[:, l] * _BASE + mat[:, l]
+        powers[l+1:l+2] = powers[l:l+1] * _BASE
+    # one entry (read r, length l) for each k <= l <= len(r), keyed by
+    # the hash of r's length-l prefix and of its length-l suffix.  The
+    # low bits of each key are replaced by the entry number, so a plain
+    # sort orders the entries by key; the join below only pairs up
+    # candidates, which are all checked afterwards.
+    ls = np.arange(k, width + 1)
+    r, l = np.nonzero(ls[None, :] <= lengths[:, None])
+    l = ls[l]
+    tag = l.astype(np.uint64) * _BASE
+    bits = np.uint64(max(len(r).bit_length(), 1))
+    low = np.uint64((1 << int(bits)) - 1)
+    entry = np.arange(len(r), dtype=np.uint64)
+    pkey = np.sort(((pre[r, l] ^ tag) & ~low) | entry)
+    skey = np.sort((((pre[r, lengths[r]] - pre[r, lengths[r] - l] * powers[l])
+                     ^ tag) & ~low) | entry)
+    del pre, tag, entry
+    pid = (pkey & low).astype(np.int64)
+    pkey >>= bits
+    sid = (skey & low).astype(np.int64)
+    skey >>= bits
+
+    # join: suffix entry sid[j] matches prefix entries pid[lo[j]:hi[j]],
+    # where hi is the end of the run of equal keys starting at lo
+    lo = np.searchsorted(pkey, skey, 'left')
+    hit = lo < len(pkey)
+    hit[hit] = pkey[lo[hit]] == skey[hit]
+    lo, sid = lo[hit], sid[hit]
+    starts = np.flatnonzero(np.concatenate(([True], pkey[1:] != pkey[:-1],
+                                            [True])))
+    run_end = np.repeat(starts[1:], np.diff(starts))
+    counts = run_end[lo] - lo
+    del pkey, skey, hit, starts, run_end
+    a = np.repeat(r[sid].astype(np.int32), counts)
+    olen = np.repeat(l[sid].astype(np.int32), counts)
+    idx = np.repeat(lo - np.cumsum(counts) + counts, counts)
+    idx += np.arange(len(idx))
+    b = r[pid[idx]].astype(np.int32)
+    del lo, counts, sid, pid, idx, r, l
+    keep = a != b
+    a, b, olen = a[keep], b[keep], olen[keep]
+
+    # verify, comparing 8-byte words (little-endian, so a partial last
+    # word keeps its low bytes); with the candidates longest first, the
+    # ones still needing word w are a prefix
+    order = np.argsort(-olen, kind='stable')
+    a, b, olen = a[order], b[order], olen[order]
+    del order
+    stride = width + 8
+    words = np.ndarray((n * stride - 7,), dtype=np.uint64, buffer=mat,
+                       strides=(1,))
+    masks = np.array([(1 << (8 * i)) - 1 for i in range(8)], dtype=np.uint64)
+    pa = a.astype(np.int64) * stride
+    pa += lengths[a] - olen
+    pb = b.astype(np.int64) * stride
+    diff = np.zeros(len(a), dtype=np.uint64)  # OR of the words' XORs
+    wa, wb = np.empty_like(diff), np.empty_like(diff)
+    for w in range(0, width, 8):
+        m = int(np.searchsorted(-olen, -w, 'left'))
+        if not m:
+            break
+        full = int(np.searchsorted(-olen, -(w + 8), 'right'))
+        words.take(pa[:m], out=wa[:m])
+        words.take(pb[:m], out=wb[:m])
+        wa[:m] ^= wb[:m]
+        wa[full:m] &= masks[olen[full:m] - w]
+        diff[:m] |= wa[:m]
+        pa[:m] += 8
+        pb[:m] += 8
+    ok = diff == 0
+    del words, mat, pa, pb, wa, wb, diff
+    a, b, olen = a[ok], b[ok], olen[ok]
+
+    # keep the longest overlap for each (a, b)
+    key = (a.astype(np.int64) * n + b) * (width + 1) + (width - olen)
+    key.sort()
+    pair = key // (width + 1)
+    first = np.ones(len(key), dtype=bool)
+    first[1:] = pair[1:] != pair[:-1]
+    pair = pair[first]
+    return ((pair // n).astype(np.int32), (pair % n).astype(np.int32),
+            (width - key[first] % (width + 1)).astype(np.int32))
+
+
+def suffix_prefix_overlaps(reads, k):
+    """ Yield (a, b, olen) read ids as overlap_arrays computes them """
+    a, b, olen = overlap_arrays(reads, k)
+    return zip(a.tolist(), b.tolist(), olen.tolist())
+
+
+def string_overlap_map(reads, k):
+    """ Return {(a, b): olen} keyed by read strings, the same dict
+        overlap_map builds, computed over the distinct reads """
+    reads = list(dict.fromkeys(reads))  # duplicates collapse, as in a dict
+    return {(reads[a], reads[b]): olen
+            for a, b, olen in suffix_prefix_overlaps(reads, k)}
+
+
+# Example
+# from fastq import read_sequences
+# olaps = string_overlap_map(read_sequences('ERR266411_1.for_asm.fastq'), 30)
+# print(len(olaps), len(set(a for a, b in olaps)))
@@ -0,0 +1,164 @@
+import bisect
+import mmap
+import struct
+
+import numpy as np
+
+from fasta import read_fasta
+
+# On-disk layout (all integers little-endian):
+#   header     magic 'PKGN', version, num records, num N-runs, genome length
+#   records    per record: offset, length, name length, name (utf-8)
+#   N-runs     per run: start, length (genome coordinates)
+#   bases      2 bits per base, 4 bases per byte, lowest bits first
+# Records are laid end to end, so offsets into the packed genome are the
+# same as offsets into the string readGenome returns for the same file.
+
+MAGIC = b'PKGN'
+VERSION = 1
+_HEADER = struct.Struct('<4sIIIQ')
+_RECORD = struct.Struct('<QQI')
+_NRUN = struct.Struct('<QQ')
+
+_ENCODE = np.zeros(256, dtype=np.uint8)  # anything else packs as 'A'...
+_VALID = np.zeros(256, dtype=bool)       # ...and is recorded as an N-run
+for _code, _bases in enumerate(('Aa', 'Cc', 'Gg', 'Tt')):
+    for _b in _bases:
+        _ENCODE[ord(_b)] = _code
+        _VALID[ord(_b)] = True
+_DECODE = np.frombuffer(b'ACGT', dtype=np.uint8)
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def pack_genome(fasta_filename, packed_filename):
+    """ Convert a FASTA file into the packed 2-bit format, one record
+        at a time.  Bases other than A/C/G/T (either case) are stored
+        as N; soft-masked (lowercase) bases come back uppercase. """
+    records, nruns, packed = [], [], []
+    length = 0
+    leftover = np.zeros(0, dtype=np.uint8)
+    for name, seq in read_fasta(fasta_filename, as_bytes=True):
+        codes = np.frombuffer(seq, dtype=np.uint8)
+        # find runs of non-ACGT characters
+        bad = np.concatenate(([False], ~_VALID[codes], [False]))
+        edges = np.flatnonzero(bad[1:] != bad[:-1])
+        for start, end in zip(edges[::2], edges[1::2]):
+            nruns.append((length + int(start), int(end - start)))
+        # pack 4 bases per byte, carrying the remainder to the next record
+        codes = np.concatenate((leftover, _ENCODE[codes]))
+        full = len(codes) - len(codes) % 4
+        packed.append(_pack(codes[:full]))
+        leftover = codes[full:]
+        records.append((name, length, len(seq)))
+        length += len(seq)
+    if len(leftover):
+        packed.append(_pack(np.concatenate(
+            (leftover, np.zeros(4 - len(leftover), dtype=np.uint8)))))
+
+    with open(packed_filename, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(records), len(nruns), length))
+        for name, offset, rlen in records:
+            name = name.encode()
+            f.write(_RECORD.pack(offset, rlen, len(name)) + name)
+        for start, rlen in nruns:
+            f.write(_NRUN.pack(start, rlen))
+        for chunk in packed:
+            f.write(chunk)
+
+
+def _pack(codes):
+    quads = codes.reshape(-1, 4)
+    return (quads[:, 0] | (quads[:, 1] << 2) |
+            (quads[:, 2] << 4) | (quads[:, 3] << 6)).tobytes()
+
+
+class PackedGenome(object):
+    """ Read-only, memory-mapped view of a packed genome.  Behaves like
+        the genome string for len(), indexing and slicing (including
+        stepped slices), so the matchers can take it in place of t. """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_records, num_nruns, self.length = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a packed genome file' % filename)
+        pos = _HEADER.size
+        self.records = []  # (name, offset, length)
+        for _ in range(num_records):
+            offset, rlen, name_len = _RECORD.unpack_from(self._mm, pos)
+            pos += _RECORD.size
+            name = self._mm[pos:pos+name_len].decode()
+            pos += name_len
+            self.records.append((name, offset, rlen))
+        self._nrun_starts, self._nrun_ends = [], []
+        for _ in range(num_nruns):
+            start, rlen = _NRUN.unpack_from(self._mm, pos)
+            pos += _NRUN.size
+            self._nrun_starts.append(start)
+            self._nrun_ends.append(start + rlen)
+        self._base = pos  # byte offset of the packed bases
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            rng = range(*key.indices(self.length))
+            if len(rng) == 0:
+                return ''
+            lo, hi = min(rng[0], rng[-1]), max(rng[0], rng[-1]) + 1
+            s = self._decode(lo, hi)
+            return s[rng.start-lo::rng.step][:len(rng)]
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError('genome index out of range')
+        i = bisect.bisect_right(self._nrun_starts, key) - 1
+        if i >= 0 and key < self._nrun_ends[i]:
+            return 'N'
+        byte = self._mm[self._base + (key >> 2)]
+        return 'ACGT'[(byte >> ((key & 3) << 1)) & 3]
+
+    def _decode(self, lo, hi):
+        """ Return bases [lo, hi) as a str """
+        first, last = lo >> 2, ((hi - 1) >> 2) + 1
+        packed = np.frombuffer(self._mm, dtype=np.uint8,
+                               count=last-first, offset=self._base+first)
+        codes = (packed[:, None] >> _SHIFTS) & 3
+        bases = _DECODE[codes.ravel()[lo-4*first:hi-4*first]]
+        # overwrite any N-runs overlapping [lo, hi)
+        i = max(bisect.bisect_right(self._nrun_starts, lo) - 1, 0)
+        while i < len(self._nrun_starts) and self._nrun_starts[i] < hi:
+            start = max(self._nrun_starts[i], lo)
+            end = min(self._nrun_ends[i], hi)
+            if start < end:
+                bases[start-lo:end-lo] = ord('N')
+            i += 1
+        return bases.tobytes().decode('ascii')
+
+    def record(self, name):
+        """ Return the sequence of a record, looked up by its full
+            header or by its ID (the first word of the header) """
+        for rname, offset, rlen in self.records:
+            if name in (rname, rname.split(' ', 1)[0]):
+                return self[offset:offset+rlen]
+        raise KeyError(name)
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Example
+# pack_genome('chr1.GRCh38.excerpt.fasta', 'chr1.GRCh38.excerpt.pkgn')
+# t = PackedGenome('chr1.GRCh38.excerpt.pkgn')
+# print(len(t), t[:10], naive_with_counts('GGCGCGGTGGCTCACGCCTGTAATCCCAGCACTTTGGGAGGCCGAGG', t))
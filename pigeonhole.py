@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+
+from hamming import encode_text, naive_kmm
+from kmer_index import KmerIndex, genome_checksum, index_filename
+
+# Longest k-mer the matcher indexes.  Seeds are also kept to at most
+# log4(len(text)) + 1 characters: longer ones are already about unique
+# in the text, and would only add distinct (k, ival) indexes to build.
+MAX_SEED_K = 12
+
+
+class ApproximateMatcher(object):
+    """ Pigeonhole approximate matching (substitutions only) against a
+        fixed text, for any pattern length and mismatch budget n.
+
+        The pattern is split into n+1 pieces, either as substrings
+        (111222333) or as subsequences taking every (n+1)th character
+        (123123123).  Any occurrence with <= n mismatches matches at
+        least one piece exactly, so index hits for the pieces give the
+        candidate offsets.  Each layout needs an index of a different
+        k and ival; those are built on first use and kept (or opened
+        from directory, see KmerIndex.open). """
+
+    def __init__(self, t, directory=None, checksum=None):
+        self.text = encode_text(t)
+        self.max_seed_k = 1
+        while self.max_seed_k < MAX_SEED_K and \
+                4 ** self.max_seed_k <= len(self.text):
+            self.max_seed_k += 1
+        self.directory = directory
+        self._checksum = checksum
+        self.indexes = {}  # (k, ival): KmerIndex
+
+    @property
+    def checksum(self):
+        if self._checksum is None:
+            self._checksum = genome_checksum(self.text)
+        return self._checksum
+
+    def index(self, k, ival=1):
+        if (k, ival) not in self.indexes:
+            if self.directory is None:
+                self.indexes[k, ival] = KmerIndex(self.text, k, ival)
+            else:
+                self.indexes[k, ival] = KmerIndex.open(
+                    self.text, k, ival, self.directory, self.checksum)
+        return self.indexes[k, ival]
+
+    def prepare(self, read_length, n):
+        """ Build (or open) every index match() would need for patterns
+            of read_length with up to n mismatches, and make sure each
+            is saved in directory if the matcher has one """
+        if read_length // (n + 1) > 0:
+            for layout in ('substring', 'subsequence'):
+                k, ival, _ = self.partitions('A' * read_length, n, layout)
+                index = self.index(k, ival)
+                if self.directory is not None:
+                    filename = index_filename(self.checksum, k, ival,
+                                              self.directory)
+                    if not os.path.exists(filename):
+                        index.save(filename)
+
+    def save_text(self):
+        """ Write the text to directory as raw bytes named by its
+            checksum (if not already there) and return the filename, so
+            other processes can memory-map it with open_text() """
+        filename = os.path.join(self.directory, '%s.seq' % self.checksum[:16])
+        if not os.path.exists(filename):
+            tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+            with open(tmp_filename, 'wb') as f:
+                f.write(self.text.tobytes())
+            os.replace(tmp_filename, filename)
+        return filename
+
+    @classmethod
+    def open_text(cls, filename, directory, checksum=None):
+        """ Return a matcher over a text written by save_text(), mapped
+            read-only rather than copied into this process """
+        text = np.memmap(filename, dtype=np.uint8, mode='r')
+        return cls(text, directory, checksum)
+
+    def partitions(self, p, n, layout):
+        """ Return (k, ival, [(piece start, piece)]) for the n+1 pieces
+            of p under layout 'substring' or 'subsequence' """
+        parts = n + 1
+        size = len(p) // parts
+        k = min(size, self.max_seed_k)
+        if layout == 'substring':
+            return k, 1, [(i*size, p[i*size:i*size+k]) for i in range(parts)]
+        span = 1 + parts * (k - 1)
+        return k, parts, [(i, p[i:i+span]) for i in range(parts)]
+
+    def candidates(self, p, n, layout='auto'):
+        """ Return (sorted unique candidate offsets, number of index
+            hits).  With layout='auto' both layouts are queried and the
+            one with fewer index hits is used. """
+        layouts = ['substring', 'subsequence'] if layout == 'auto' else [layout]
+        best = None
+        for lay in layouts:
+            k, ival, pieces = self.partitions(p, n, lay)
+            index = self.index(k, ival)
+            hits = [np.asarray(index.query(piece), dtype=np.int64) - start
+                    for start, piece in pieces]
+            num_hits = sum(len(h) for h in hits)
+            if best is None or num_hits < best[1]:
+                best = hits, num_hits
+        hits, num_hits = best
+        offsets = np.unique(np.concatenate(hits))
+        offsets = offsets[(offsets >= 0) & (offsets <= len(self.text) - len(p))]
+        return offsets, num_hits
+
+    def verify(self, p, offsets, n, block=16):
+        """ Return (offsets, mismatches) for the candidates where p
+            aligns with <= n mismatches.  All candidates are compared
+            together, block columns at a time, dropping any that have
+            already exceeded n. """
+        pa = encode_text(p)
+        mm = np.zeros(len(offsets), dtype=np.int32)
+        for j in range(0, len(pa), block):
+            if len(offsets) == 0:
+                break
+            cols = np.arange(j, min(j + block, len(pa)))
+            window = self.text[offsets[:, None] + cols]
+            mm += np.count_nonzero(window != pa[cols], axis=1)
+            keep = mm <= n
+            offsets, mm = offsets[keep], mm[keep]
+        return offsets, mm
+
+    def match(self, p, n, layout='auto', counts=False, mismatches=False):
+        """ Return sorted offsets of occurrences of p in t with up to n
+            mismatches.  With mismatches=True, return (offset, number of
+            mismatches) pairs instead.  With counts=True, also return
+            the number of index hits examined. """
+        if len(p) // (n + 1) == 0:
+            # too short to partition; scan the whole text instead
+            offsets = np.array(naive_kmm(p, self.text, n), dtype=np.int64)
+            num_hits = 0
+        else:
+            offsets, num_hits = self.candidates(p, n, layout)
+        offsets, mm = self.verify(p, offsets, n)
+        if mismatches:
+            occurrences = list(zip(offsets.tolist(), mm.tolist()))
+        else:
+            occurrences = offsets.tolist()
+        if counts:
+            return occurrences, num_hits
+        return occurrences
+
+
+def approximate_match(p, t, n):
+    """ One-off pigeonhole match of p against t with up to n mismatches """
+    return ApproximateMatcher(t).match(p, n)
+
+
+# Example
+# t = readGenome('chr1.GRCh38.excerpt.fasta')
+# matcher = ApproximateMatcher(t)
+# for n in range(5):
+#     print(n, matcher.match('GGCGCGGTGGCTCACGCCTGTAAT', n, counts=True))
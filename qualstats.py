@@ -0,0 +1,91 @@
+import numpy as np
+
+from fastq import read_fastq_records
+
+NUM_QUALS = 94  # Phred+33 covers '!' (Q0) to '~' (Q93)
+
+
+class QualityStats(object):
+    """ Running quality statistics over reads of any length.  Holds one
+        histogram row of quality counts per read position, so memory
+        depends only on the longest read, never on the number of reads.
+        Sums, means, quantiles and the overall histogram (as createHist
+        computes) are all derived from it. """
+
+    def __init__(self):
+        self.pos_hist = np.zeros((0, NUM_QUALS), dtype=np.int64)
+        self.num_reads = 0
+
+    def update(self, quals):
+        """ Add a batch of Phred+33 quality strings.  The whole batch is
+            decoded at once into a uint8 array and binned by (position,
+            quality) with a single bincount. """
+        if not quals:
+            return
+        lengths = np.fromiter(map(len, quals), dtype=np.int64, count=len(quals))
+        q = np.frombuffer(''.join(quals).encode('ascii'), dtype=np.uint8) - 33
+        if len(q) and q.max() >= NUM_QUALS:
+            raise ValueError('quality character out of Phred+33 range')
+        # position of each base within its read
+        starts = np.cumsum(lengths) - lengths
+        positions = np.arange(len(q)) - np.repeat(starts, lengths)
+        max_len = int(lengths.max())
+        if max_len > len(self.pos_hist):
+            grown = np.zeros((max_len, NUM_QUALS), dtype=np.int64)
+            grown[:len(self.pos_hist)] = self.pos_hist
+            self.pos_hist = grown
+        counts = np.bincount(positions * NUM_QUALS + q,
+                             minlength=max_len * NUM_QUALS)
+        self.pos_hist[:max_len] += counts.reshape(max_len, NUM_QUALS)
+        self.num_reads += len(quals)
+
+    @property
+    def hist(self):
+        """ Count of bases at each quality, as createHist returns """
+        return self.pos_hist.sum(axis=0)
+
+    @property
+    def counts(self):
+        """ Number of reads long enough to have each position """
+        return self.pos_hist.sum(axis=1)
+
+    @property
+    def sums(self):
+        """ Total quality at each read position, as sum_quals returns """
+        return self.pos_hist @ np.arange(NUM_QUALS)
+
+    @property
+    def means(self):
+        """ Mean quality at each read position """
+        return self.sums / np.maximum(self.counts, 1)
+
+    def quantiles(self, fractions=(0.25, 0.5, 0.75)):
+        """ Return an array with one row per fraction and one column per
+            read position: the lowest quality such that at least that
+            fraction of the bases at the position are at or below it """
+        cum = np.cumsum(self.pos_hist, axis=1)
+        rows = []
+        for frac in fractions:
+            target = np.maximum(np.ceil(frac * self.counts), 1)
+            rows.append(np.argmax(cum >= target[:, None], axis=1))
+        return np.array(rows)
+
+
+def quality_stats(filename, batch_size=100000):
+    """ Compute QualityStats for a FASTQ file in one streaming pass,
+        batch_size reads at a time """
+    stats = QualityStats()
+    batch = []
+    for _, _, qual in read_fastq_records(filename):
+        batch.append(qual)
+        if len(batch) == batch_size:
+            stats.update(batch)
+            batch = []
+    stats.update(batch)
+    return stats
+
+
+# Example
+# stats = quality_stats('ERR037900_1.first1000.fastq')
+# sums = stats.sums
+# print("min_sum is", sums.min(), "which is at read number:", sums.argmin())
@@ -0,0 +1,148 @@
+import numpy as np
+
+from overlaps import overlap
+
+
+def overlap_matrix(ss):
+    """ Return the n x n int32 matrix of overlap(ss[i], ss[j], 1) for
+        i != j (0 on the diagonal), computed once per pair """
+    n = len(ss)
+    olaps = np.zeros((n, n), dtype=np.int32)
+    for i in range(n):
+        for j in range(n):
+            if i != j:
+                olaps[i, j] = overlap(ss[i], ss[j], min_length=1)
+    return olaps
+
+
+def held_karp_table(olaps):
+    """ Return table f of shape (2**n, n): f[rem, i] is the largest
+        total overlap of any ordering of the strings in bitmask rem
+        placed after string i.  Filled one popcount layer at a time,
+        each step vectorized over every mask in the layer holding a
+        given string j. """
+    n = len(olaps)
+    masks = np.arange(1 << n, dtype=np.int64)
+    popcount = np.zeros(1 << n, dtype=np.int64)
+    for j in range(n):
+        popcount += (masks >> j) & 1
+    layers = np.argsort(popcount, kind='stable')
+    bounds = np.searchsorted(popcount[layers], np.arange(n + 2))
+    f = np.zeros((1 << n, n), dtype=np.int32)
+    for c in range(1, n + 1):
+        layer = layers[bounds[c]:bounds[c+1]]
+        for j in range(n):
+            rem = layer[(layer >> j) & 1 == 1]
+            # place j next, then the best ordering of the rest
+            cand = olaps[:, j][None, :] + f[rem ^ (1 << j), j][:, None]
+            f[rem] = np.maximum(f[rem], cand)
+    return f
+
+
+def _dp_orderings(olaps):
+    """ Yield every ordering with the maximum total overlap, in
+        itertools.permutations order, by walking the Held-Karp table """
+    n = len(olaps)
+    f = held_karp_table(olaps)
+    full = (1 << n) - 1
+    best = max(int(f[full ^ (1 << i), i]) for i in range(n))
+    olaps = olaps.tolist()
+    order = []
+
+    def walk(rem, need):
+        if not rem:
+            yield list(order)
+            return
+        prev = order[-1]
+        for j in range(n):
+            if rem >> j & 1:
+                rest = rem ^ (1 << j)
+                if olaps[prev][j] + int(f[rest, j]) == need:
+                    order.append(j)
+                    yield from walk(rest, need - olaps[prev][j])
+                    order.pop()
+
+    for i in range(n):
+        if int(f[full ^ (1 << i), i]) == best:
+            order.append(i)
+            yield from walk(full ^ (1 << i), best)
+            order.pop()
+
+
+def _bnb_orderings(olaps):
+    """ Return every ordering with the maximum total overlap, in
+        itertools.permutations order, by depth-first search.  A branch
+        is cut when its overlap so far plus the best possible incoming
+        overlap of each string left cannot reach the best total known;
+        a nearest-neighbour chain gives the starting total.  Memory is
+        O(n) beyond the results. """
+    n = len(olaps)
+    best_in = olaps.max(axis=0).tolist()  # most any string j can gain
+    olaps = olaps.tolist()
+    # starting lower bound: greedily extend a chain from each string
+    best = 0
+    for i in range(n):
+        left, prev, total = set(range(n)) - {i}, i, 0
+        while left:
+            j = max(left, key=lambda j: (olaps[prev][j], -j))
+            total += olaps[prev][j]
+            left.remove(j)
+            prev = j
+        best = max(best, total)
+    found = []
+    order = []
+
+    def search(rem, total, bound):
+        nonlocal best, found
+        if total + bound < best:
+            return
+        if not rem:
+            if total > best:
+                best, found = total, []
+            found.append(list(order))
+            return
+        prev = order[-1]
+        for j in range(n):
+            if rem >> j & 1:
+                order.append(j)
+                search(rem ^ (1 << j), total + olaps[prev][j],
+                       bound - best_in[j])
+                order.pop()
+
+    full = (1 << n) - 1
+    for i in range(n):
+        order.append(i)
+        search(full ^ (1 << i), 0, sum(best_in) - best_in[i])
+        order.pop()
+    return found
+
+
+def scs_exact(ss, max_table_bytes=1 << 28):
+    """ Return all shortest common superstrings of ss, one per optimal
+        ordering and in the same order scs_list returns them, without
+        trying every permutation.  Overlaps are computed once into a
+        matrix; the orderings come from a Held-Karp DP over subsets
+        (O(2**n n**2) time, 4 * 2**n * n bytes for the table), or, when
+        that table would exceed max_table_bytes, from a branch-and-bound
+        search that needs no table. """
+    n = len(ss)
+    if n == 0:
+        return ['']
+    olaps = overlap_matrix(ss)
+    if 4 * n << n <= max_table_bytes:
+        orderings = _dp_orderings(olaps)
+    else:
+        orderings = _bnb_orderings(olaps)
+    olaps = olaps.tolist()
+    sups = []
+    for order in orderings:
+        sup = [ss[order[0]]]
+        for a, b in zip(order, order[1:]):
+            sup.append(ss[b][olaps[a][b]:])
+        sups.append(''.join(sup))
+    return sups
+
+
+# Example
+# ans = scs_exact(['CCT', 'CTT', 'TGC', 'TGG', 'GAT', 'ATT'])
+# print("scs:", ans, "len:", len(ans), "str len:", len(ans[0]))
@@ -0,0 +1,62 @@
+from edit_distance import approx_match_iter
+
+
+def seed_windows(p, t, index, max_dist):
+    """ Return (windows, number of seed hits).  p is split into
+        max_dist+1 non-overlapping pieces; with at most max_dist edits
+        one of them must occur exactly, so each index hit for a piece
+        (its first index.k characters) pins a diagonal, and any match
+        through that seed lies within max_dist of it.  The windows of
+        t around those diagonals are merged and returned sorted. """
+    parts = max_dist + 1
+    size = len(p) // parts
+    if size < index.k:
+        raise ValueError('pattern of length %d is too short to seed with '
+                         '%d-mers at %d edits' % (len(p), index.k, max_dist))
+    windows = []
+    num_hits = 0
+    for i in range(parts):
+        hits = index.query(p[i*size:i*size+index.k])
+        num_hits += len(hits)
+        for h in hits:
+            start = h - i*size  # where p would start on this diagonal
+            windows.append((max(0, start - max_dist),
+                            min(len(t), start + len(p) + max_dist)))
+    windows.sort()
+    merged = []
+    for start, end in windows:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged, num_hits
+
+
+def seed_and_extend(p, t, index, max_dist, counts=False):
+    """ Find approximate matches of p in t with up to max_dist edits
+        (substitutions, insertions and deletions).  Seeds from index (a
+        KmerIndex or Index over t) pick candidate windows, and only
+        those windows are verified with edit distance, so the cost
+        follows the number of seed hits rather than len(t).  Returns
+        sorted (start, end, distance, CIGAR) tuples as
+        approx_match_iter does; with counts=True, also the number of
+        seed hits. """
+    windows, num_hits = seed_windows(p, t, index, max_dist)
+    best = {}  # end: (start, end, distance, CIGAR)
+    for wstart, wend in windows:
+        for start, end, dist, cigar in approx_match_iter(p, t[wstart:wend],
+                                                         max_dist):
+            end += wstart
+            # separate windows can reach the same end; keep the closest
+            if end not in best or dist < best[end][2]:
+                best[end] = (wstart + start, end, dist, cigar)
+    matches = [best[end] for end in sorted(best)]
+    if counts:
+        return matches, num_hits
+    return matches
+
+
+# Example
+# t = readGenome('chr1.GRCh38.excerpt.fasta')
+# index = KmerIndex(t, 8)
+# print(seed_and_extend('GGCGCGGTGGCTCACGCCTGTAAT', t, index, 2))
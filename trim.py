@@ -0,0 +1,105 @@
+import gzip
+
+import numpy as np
+
+from fastq import parse_fastq
+
+
+def clip_adapter(seq, adapter, min_overlap=3):
+    """ Return the length of seq left after removing adapter: from its
+        first full occurrence, or else from a partial adapter (a prefix
+        at least min_overlap long) hanging off the 3' end """
+    i = seq.find(adapter)
+    if i >= 0:
+        return i
+    for olen in range(min(len(adapter), len(seq)) - 1, min_overlap - 1, -1):
+        if seq.endswith(adapter[:olen]):
+            return len(seq) - olen
+    return len(seq)
+
+
+def trim_batch(records, window=4, min_quality=20, min_length=36, max_n=None,
+               adapter=None, min_adapter_overlap=3):
+    """ Trim and filter a batch of (name, seq, qual) bytes records,
+        returning the surviving records.  In order, each read is:
+          - clipped at the adapter, if one is given
+          - cut at the start of the first window of window bases whose
+            mean quality (Phred+33) is below min_quality
+          - dropped if it has more than max_n N's, or fewer than
+            min_length bases left
+        Quality and N checks run over the whole batch at once, with the
+        reads laid out as rows of a padded uint8 matrix, filled through
+        a boolean mask of the read positions (no index arrays); window
+        sums are int32, so the working set is about 11 bytes per base. """
+    if not records:
+        return []
+    lengths = np.array([len(seq) for _, seq, _ in records], dtype=np.int64)
+    if adapter is not None:
+        adapter = adapter.encode() if isinstance(adapter, str) else adapter
+        lengths = np.array([clip_adapter(seq, adapter, min_adapter_overlap)
+                            for _, seq, _ in records], dtype=np.int64)
+    width = max(int(lengths.max()), 1)
+    # mask[r, i]: position i is within read r; in row-major order its
+    # True cells line up with the reads joined end to end
+    mask = np.arange(width) < lengths[:, None]
+    clipped = lengths.tolist()
+    quals = np.zeros((len(records), width), dtype=np.uint8)
+    quals[mask] = np.frombuffer(
+        b''.join(q[:n] for (_, _, q), n in zip(records, clipped)),
+        dtype=np.uint8)
+    quals[mask] -= 33
+    # window sums: csum[:, i+window] - csum[:, i] for every start i
+    if width >= window:
+        csum = np.zeros((len(records), width + 1), dtype=np.int32)
+        np.cumsum(quals, axis=1, dtype=np.int32, out=csum[:, 1:])
+        del quals
+        low = csum[:, window:] - csum[:, :-window] < min_quality * window
+        del csum
+        low &= mask[:, window-1:]  # the window lies within the read
+        has_low = low.any(axis=1)
+        lengths = np.where(has_low, np.argmax(low, axis=1), lengths)
+        del low
+    keep = lengths >= min_length
+    if max_n is not None:
+        bases = np.zeros((len(records), width), dtype=np.uint8)
+        bases[mask] = np.frombuffer(
+            b''.join(s[:n] for (_, s, _), n in zip(records, clipped)),
+            dtype=np.uint8)
+        ns = ((bases == ord('N')) &
+              (np.arange(width) < lengths[:, None])).sum(axis=1)
+        keep &= ns <= max_n
+    return [(name, seq[:n], qual[:n])
+            for (name, seq, qual), n, k in zip(records, lengths.tolist(), keep)
+            if k]
+
+
+def trim_fastq(in_filename, out_filename, batch_size=100000, **options):
+    """ Stream in_filename through trim_batch (see there for options),
+        batch_size reads at a time, writing survivors to out_filename
+        (gzipped if it ends in .gz).  Returns a dict of read and base
+        counts in and out. """
+    stats = {'reads_in': 0, 'reads_out': 0, 'bases_in': 0, 'bases_out': 0}
+    opener = gzip.open if out_filename.endswith('.gz') else open
+    with opener(out_filename, 'wb') as out:
+        batch = []
+        for name, seq, qual in parse_fastq(in_filename):
+            batch.append((bytes(name), bytes(seq), bytes(qual)))
+            if len(batch) == batch_size:
+                _write_batch(out, batch, stats, options)
+                batch = []
+        _write_batch(out, batch, stats, options)
+    return stats
+
+
+def _write_batch(out, batch, stats, options):
+    stats['reads_in'] += len(batch)
+    stats['bases_in'] += sum(len(seq) for _, seq, _ in batch)
+    kept = trim_batch(batch, **options)
+    stats['reads_out'] += len(kept)
+    stats['bases_out'] += sum(len(seq) for _, seq, _ in kept)
+    out.write(b''.join(b'@%s\n%s\n+\n%s\n' % rec for rec in kept))
+
+
+# Example
+# print(trim_fastq('ERR037900_1.first1000.fastq', 'trimmed.fastq',
+#                  window=4, min_quality=20, min_length=36, max_n=2))
@@ -1,5 +1,8 @@
 import matplotlib.pyplot as plt
 
+from fasta import read_genome
+from fastq import read_fastq_records
+
 
 def naive(p, t):
     occurrences = []
@@ -30,28 +33,17 @@ def reverseComplement(s):
 
 
 def readGenome(filename):
-    genome = ''
-    with open(filename, 'r') as f:
-        for line in f:
-            # ignore header line with genome information
-            if not line[0] == '>':
-                genome += line.rstrip()
-    return genome
+    # read in blocks, appending each run of sequence to the genome in place
+    return read_genome(filename)
 
 
 def readFastq(filename):
     sequences = []
     qualities = []
-    with open(filename) as fh:
-        while True:
-            fh.readline()  # skip name line
-            seq = fh.readline().rstrip()  # read base sequence
-            fh.readline()  # skip placeholder line
-            qual = fh.readline().rstrip()  # base quality line
-            if len(seq) == 0:
-                break
-            sequences.append(seq)
-            qualities.append(qual)
+    # single-pass streaming parser; validates each record as it goes
+    for _, seq, qual in read_fastq_records(filename):
+        sequences.append(seq)
+        qualities.append(qual)
     return sequences, qualities
 
 
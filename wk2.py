@@ -1,3 +1,7 @@
+from fasta import read_genome
+from kmer_index import KmerIndex
+
+
 def naive_2mm(p, t):
     occurrences = []
     for i in range(len(t) - len(p) + 1):  # loop over alignments
@@ -14,13 +18,8 @@ def naive_2mm(p, t):
     return occurrences
 
 def readGenome(filename):
-    genome = ''
-    with open(filename, 'r') as f:
-        for line in f:
-            # ignore header line with genome information
-            if not line[0] == '>':
-                genome += line.rstrip()
-    return genome
+    # read in blocks, appending each run of sequence to the genome in place
+    return read_genome(filename)
 
 # implement versions of the naive exact matching and 
 # Boyer-Moore algorithms that additionally count and return 
@@ -69,6 +68,10 @@ from bm_preproc import BoyerMoore
 def boyer_moore_with_counts(p, p_bm, t):
     """ Do Boyer-Moore matching. p=pattern, t=text,
         p_bm=BoyerMoore object for p """
+    # read the precomputed skip tables directly instead of calling
+    # p_bm.bad_character_rule / good_suffix_rule per mismatch
+    bc, gs, amap = p_bm.bad_char_skip, p_bm.good_suffix_skip, p_bm.amap
+    a = len(p_bm.alphabet)
     i = 0
     occurrences = []
     num_aligns, num_chars = 0, 0
@@ -78,16 +81,16 @@ def boyer_moore_with_counts(p, p_bm, t):
         mismatched = False
         for j in range(len(p)-1, -1, -1):
             num_chars += 1
-            if p[j] != t[i+j]:
-                skip_bc = p_bm.bad_character_rule(j, t[i+j])
-                skip_gs = p_bm.good_suffix_rule(j)
-                shift = max(shift, skip_bc, skip_gs)
+            c = t[i+j]
+            if p[j] != c:
+                ci = amap.get(c)
+                skip_bc = j + 1 if ci is None else bc[j*a + ci]
+                shift = max(shift, skip_bc, gs[j])
                 mismatched = True
                 break
         if not mismatched:
             occurrences.append(i)
-            skip_gs = p_bm.match_skip()
-            shift = max(shift, skip_gs)
+            shift = max(shift, p_bm.match_skip_len)
         i += shift
     return occurrences, num_aligns, num_chars
 
@@ -213,7 +216,8 @@ def approximate_matches(p, t, index):
 # Hint 2: You can check your work by comparing the output of your new function to that of the 
 # naive_2mm function implemented in the previous module.  
 
-index = Index(t, 8)
+# index = Index(t, 8)
+index = KmerIndex.open(t, 8)  # same query() contract, built once and mmapped after
 p = "GGCGCGGTGGCTCACGCCTGTAAT"
 all_matches = approximate_matches(p, t, index)
 print("4. all_matches:", all_matches, "len ", len(all_matches))
@@ -322,7 +326,7 @@ def query_subseq(p, t, subseq_index):
 
 
 p = "GGCGCGGTGGCTCACGCCTGTAAT"
-subseq_index = SubseqIndex(t, 8, 3)
+subseq_index = KmerIndex.open(t, 8, 3)  # same query() contract as SubseqIndex
 print("5.")
 query_subseq(p, t, subseq_index)
 
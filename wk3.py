@@ -1,14 +1,13 @@
 from itertools import permutations
 
+from fasta import read_genome
+from fastq import read_sequences
+from overlaps import overlap_arrays, string_overlap_map
+
 
 def readGenome(filename):
-    genome = ''
-    with open(filename, 'r') as f:
-        for line in f:
-            # ignore header line with genome information
-            if not line[0] == '>':
-                genome += line.rstrip()
-    return genome
+    # read in blocks, appending each run of sequence to the genome in place
+    return read_genome(filename)
 
 
 def editDistance(x, y):
@@ -102,41 +101,14 @@ def naive_overlap_map(reads, k):
 
 
 def overlap_map(fastq_file, k):
-    with open(fastq_file, 'r') as f:
-        reads = f.readlines()
-        reads = [r.strip() for r in reads[1::4]]
+    reads = read_sequences(fastq_file)  # streamed, not f.readlines()
     # reads = ['CGTACG', 'TACGTA', 'GTACGT', 'ACGTAC', 'GTACGA', 'TACGAT']
     # print("reads:", reads)
 
-    # For every k-mer in a read, we add the read to the set object corresponding
-    # to that k-mer
-    d = {}  # kmer:set(reads)
-    for r in reads:
-        i = 0
-        for i in range(len(r) - k + 1):
-            kmer = r[i:i+k]
-            if kmer not in d:
-                d[kmer] = set()
-            d[kmer].add(r)
-    # print("d:", d)
-
-    # Now, for each read 'a' we find all overlaps involving a suffix of 'a'.
-    # To do this, we take a's length-k suffix, find all reads containing that
-    # k-mer (obtained from the corresponding set) and call
-    # overlap(a, b, min_length=k) for each.
-    # The most important point is that we do not call overlap(a, b, min_length=k)
-    # if 'b' does not contain the length-k suffix of 'a'.
-
-    olaps = {}
-    for a in reads:
-        suff = a[-k:]
-        for b in d[suff]:
-            if a == b:
-                continue
-            olen = overlap(a, b, min_length=k)
-            if olen >= k:
-                olaps[(a, b)] = olen
-    return olaps
+    # Every read suffix and prefix of length >= k is hashed and the two
+    # sets are joined by sorting, so overlap() is never called per pair;
+    # see overlaps.py.  Same {(a, b): olen} dict as before.
+    return string_overlap_map(reads, k)
 
 
 # print(overlap_map('test.fastq', 4))
@@ -144,6 +116,8 @@ def overlap_map(fastq_file, k):
 
 infile = 'ERR266411_1.for_asm.fastq'
 k = 30
-olaps = (overlap_map(infile, k))
-print("len of olaps:", len(olaps))
-print(len(set(k[0] for k in olaps)))
+# only the counts are printed, so keep the overlaps as read id arrays
+# rather than building the {(a, b): olen} dict of read strings
+a, b, olen = overlap_arrays(list(dict.fromkeys(read_sequences(infile))), k)
+print("len of olaps:", len(a))
+print(len(set(a.tolist())))
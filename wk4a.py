@@ -1,4 +1,4 @@
-import itertools
+from scs_exact import scs_exact
 
 def overlap(a, b, min_length=3):
     '''return length of longest suffix of 'a' matching
@@ -20,20 +20,9 @@ def scs_list(ss):
     '''return shortest common superstring of given
     strings, which must be the same length
     '''
-    shortest_sup = [None]
-    for ssperm in itertools.permutations(ss):
-        sup = ssperm[0]  # superstring starts as first string
-        for i in range(len(ss) - 1):
-            # overlap adjacent strings in the permutation
-            olen = overlap(ssperm[i], ssperm[i+1], min_length=1)
-            # add non-overlapping portion of b to sup
-            sup += ssperm[i+1][olen:]
-        if shortest_sup[0] is None or len(sup) < len(shortest_sup[0]):
-            shortest_sup = [sup]
-        else:
-            if len(sup) == len(shortest_sup[0]):
-                shortest_sup.append(sup)
-    return shortest_sup
+    # Held-Karp DP over subsets of a precomputed overlap matrix rather
+    # than every permutation; same superstrings, in the same order
+    return scs_exact(ss)
 
 
 ans1 = scs_list(['CCT', 'CTT', 'TGC', 'TGG', 'GAT', 'ATT'])